@@ -116,7 +116,7 @@ resource "aws_api_gateway_integration" "google_login" {
 
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.auth_functions["google_auth"].invoke_arn
+  uri                     = local.lambda_invoke_arns["google_auth"]
 }
 
 resource "aws_api_gateway_integration" "google_callback" {
@@ -126,7 +126,7 @@ resource "aws_api_gateway_integration" "google_callback" {
 
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.auth_functions["google_auth"].invoke_arn
+  uri                     = local.lambda_invoke_arns["google_auth"]
 }
 
 # OPTIONS methods for CORS support
@@ -258,7 +258,7 @@ resource "aws_api_gateway_integration" "lambda" {
 
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.auth_functions[each.key].invoke_arn
+  uri                     = local.lambda_invoke_arns[each.key]
 }
 
 resource "aws_api_gateway_integration" "options" {
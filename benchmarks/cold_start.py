@@ -0,0 +1,101 @@
+"""
+Measure Lambda init cost per function, locally.
+
+Each handler module is imported in a fresh interpreter (a cold start: shared
+layer, boto3 and module-level clients included), then re-executed in the same
+interpreter (a warm re-init: only the handler's own module body). The
+difference is what provisioned concurrency or SnapStart takes off the first
+request. Network prewarm tasks are not run (AWS_LAMBDA_INITIALIZATION_TYPE is
+left at on-demand), so the numbers are the CPU/import part of init only.
+
+Usage:
+    python benchmarks/cold_start.py [--runs 5] [function ...]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FUNCTIONS_DIR = os.path.join(ROOT, 'lambda_functions')
+SHARED_DIR = os.path.join(FUNCTIONS_DIR, 'shared')
+
+# Enough configuration for every handler to import without touching AWS
+FAKE_ENVIRONMENT = {
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_ACCESS_KEY_ID': 'benchmark',
+    'AWS_SECRET_ACCESS_KEY': 'benchmark',
+    'COGNITO_USER_POOL_ID': 'us-east-1_benchmark',
+    'COGNITO_CLIENT_ID': 'benchmark',
+    'USERS_TABLE': 'benchmark-users',
+    'RATE_LIMIT_TABLE': 'benchmark-rate-limits',
+    'FEDERATED_AUTH_SECRET': 'benchmark',
+    'GOOGLE_CLIENT_ID': 'benchmark',
+    'GOOGLE_CLIENT_SECRET': 'benchmark',
+    'TURNSTILE_SECRET_KEY': 'benchmark',
+    'LOGIN_ACTIVITY_QUEUE_URL': 'https://sqs.us-east-1.amazonaws.com/000000000000/benchmark',
+}
+
+PROBE = '''
+import importlib.util, os, sys, time
+# Lambda puts the function's own directory (/var/task) ahead of the layer
+sys.path[:0] = [os.path.dirname({path!r}), {shared!r}]
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location('handler', {path!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+cold = time.perf_counter() - started
+started = time.perf_counter()
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+warm = time.perf_counter() - started
+print(cold * 1000, warm * 1000)
+'''
+
+
+def handler_names():
+    return sorted(
+        name for name in os.listdir(FUNCTIONS_DIR)
+        if os.path.isfile(os.path.join(FUNCTIONS_DIR, name, 'handler.py'))
+    )
+
+
+def measure(name, runs):
+    """Return (cold_ms, warm_ms) medians over runs, or None if the import fails"""
+    path = os.path.join(FUNCTIONS_DIR, name, 'handler.py')
+    env = dict(os.environ, **FAKE_ENVIRONMENT)
+    env.pop('AWS_LAMBDA_INITIALIZATION_TYPE', None)
+    env.pop('WARMUP_ON_DEMAND', None)
+
+    cold, warm = [], []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', PROBE.format(shared=SHARED_DIR, path=path)],
+            env=env, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            print(f"{name}: import failed\n{result.stderr.strip()}", file=sys.stderr)
+            return None
+        cold_ms, warm_ms = (float(value) for value in result.stdout.split()[-2:])
+        cold.append(cold_ms)
+        warm.append(warm_ms)
+    return statistics.median(cold), statistics.median(warm)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('functions', nargs='*', help='Functions to measure (default: all)')
+    parser.add_argument('--runs', type=int, default=5, help='Interpreter starts per function')
+    args = parser.parse_args()
+
+    print(f"{'function':<24} {'cold init ms':>13} {'warm re-init ms':>16} {'saved ms':>9}")
+    for name in args.functions or handler_names():
+        result = measure(name, args.runs)
+        if result is None:
+            continue
+        cold, warm = result
+        print(f"{name:<24} {cold:>13.1f} {warm:>16.1f} {cold - warm:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
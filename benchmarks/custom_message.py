@@ -0,0 +1,88 @@
+"""
+Compare the custom_message templates against per-invocation rendering.
+
+"per-invocation" reproduces what the trigger did before templates.py: log the
+whole event as JSON, then build the full, unminified HTML with its <style>
+block on every call. "compiled" is templates.render_message with a warm
+cache; "compile" is the one-off cost per (trigger, locale) on a cold container.
+
+Usage:
+    python benchmarks/custom_message.py [--runs 20000]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime
+from string import Template
+
+FUNCTIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lambda_functions')
+sys.path[:0] = [os.path.join(FUNCTIONS_DIR, 'custom_message'), os.path.join(FUNCTIONS_DIR, 'shared')]
+
+import templates
+
+
+def event_for(trigger_source):
+    return {
+        'version': '1', 'region': 'us-east-1', 'userPoolId': 'us-east-1_benchmark',
+        'userName': '6f1c1f5e-1d7b-4c44-9d5e-0c3f1a2b3c4d', 'triggerSource': trigger_source,
+        'callerContext': {'awsSdkVersion': 'aws-sdk-unknown-unknown', 'clientId': 'benchmark'},
+        'request': {
+            'userAttributes': {
+                'sub': '6f1c1f5e-1d7b-4c44-9d5e-0c3f1a2b3c4d', 'email_verified': 'false',
+                'cognito:user_status': 'UNCONFIRMED', 'name': 'Bench Mark', 'email': 'bench@example.com'
+            },
+            'codeParameter': '{####}', 'linkParameter': '{##Click Here##}', 'usernameParameter': None
+        },
+        'response': {'smsMessage': None, 'emailMessage': None, 'emailSubject': None}
+    }
+
+
+def per_invocation(event):
+    """The pre-templates approach: full event log line plus a fresh unminified document"""
+    line = f"Custom message trigger called with event: {json.dumps(event, default=str)}"
+    spec = templates.MESSAGES['en'][event['triggerSource']]
+    theme = templates.THEMES[spec['theme']]
+    stylesheet = '\n'.join(
+        f"        .{name} {{ {Template(rule).substitute(theme)} }}" for name, rule in templates.STYLES.items()
+    )
+    markup = templates.LAYOUT.replace('<head>', f"<head>\n    <style>\n{stylesheet}\n    </style>")
+    markup = Template(markup).safe_substitute(tagline=spec['tagline'], content=spec['content'], footer=spec['footer'])
+    body = Template(markup).substitute(
+        templates.COMMON['en'], lang='en',
+        project_name=templates.PROJECT_NAME, current_year=datetime.now().year,
+        code=event['request']['codeParameter'], username=event['request']['userAttributes']['email']
+    )
+    return line, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'trigger':<32} {'per-invocation us':>18} {'compiled us':>12} {'compile us':>11} "
+          f"{'bytes before':>13} {'bytes after':>12}")
+    for trigger_source in templates.MESSAGES['en']:
+        event = event_for(trigger_source)
+        request = event['request']
+
+        def compiled():
+            return templates.render_message(trigger_source, code=request['codeParameter'],
+                                            username=request['userAttributes']['email'])
+
+        before_us = timeit.timeit(lambda: per_invocation(event), number=args.runs) / args.runs * 1e6
+        after_us = timeit.timeit(compiled, number=args.runs) / args.runs * 1e6
+        compile_us = timeit.timeit(
+            lambda: templates.compile_message(trigger_source, 'en', 2024), number=args.runs // 20
+        ) / (args.runs // 20) * 1e6
+
+        before_bytes = len(per_invocation(event)[1].encode('utf-8'))
+        after_bytes = len(compiled()[1].encode('utf-8'))
+        print(f"{trigger_source:<32} {before_us:>18.1f} {after_us:>12.1f} {compile_us:>11.1f} "
+              f"{before_bytes:>13} {after_bytes:>12}")
+
+
+if __name__ == '__main__':
+    main()
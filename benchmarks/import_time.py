@@ -0,0 +1,108 @@
+"""
+Break down each handler's import time and flag eager AWS SDK imports.
+
+Every handler is imported in a fresh interpreter under `python -X importtime`.
+The report lists the import time on top of a bare interpreter start,
+whether boto3 was imported during init (clients come from
+shared/aws_clients.py and should be built on first use instead) and the
+slowest modules. With --budget-ms the script exits
+non-zero when a handler goes over, so it can guard against regressions.
+
+Usage:
+    python benchmarks/import_time.py [--budget-ms 150] [--top 5] [function ...]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from cold_start import FAKE_ENVIRONMENT, FUNCTIONS_DIR, SHARED_DIR, handler_names
+
+# "import time: self [us] | cumulative | imported package"
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$')
+
+PROBE = '''
+import importlib.util, os, sys
+sys.path.insert(0, {shared!r})
+if {path!r}:
+    # Lambda puts the function's own directory (/var/task) ahead of the layer
+    sys.path.insert(0, os.path.dirname({path!r}))
+    spec = importlib.util.spec_from_file_location('handler', {path!r})
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+'''
+
+
+def import_profile(name):
+    """
+    Import one handler (or nothing, when name is None) and parse the -X importtime report
+
+    Returns:
+        list of (module, self_us, cumulative_us, depth), or None if the import fails
+    """
+    path = os.path.join(FUNCTIONS_DIR, name, 'handler.py') if name else ''
+    env = dict(os.environ, **FAKE_ENVIRONMENT)
+    env.pop('AWS_LAMBDA_INITIALIZATION_TYPE', None)
+    env.pop('WARMUP_ON_DEMAND', None)
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE.format(shared=SHARED_DIR, path=path)],
+        env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(f"{name}: import failed\n{result.stderr.strip()}", file=sys.stderr)
+        return None
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            modules.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return modules
+
+
+def summarize(modules):
+    """Total milliseconds spent in top-level imports and whether boto3 was loaded"""
+    total_ms = sum(cumulative for _, _, cumulative, depth in modules if depth == 0) / 1000
+    loads_boto3 = any(module == 'boto3' for module, _, _, _ in modules)
+    return total_ms, loads_boto3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('functions', nargs='*', help='Functions to profile (default: all)')
+    parser.add_argument('--runs', type=int, default=3, help='Interpreter starts per function')
+    parser.add_argument('--top', type=int, default=5, help='Slowest modules to list per function')
+    parser.add_argument('--budget-ms', type=float, help='Fail when a handler imports slower than this')
+    args = parser.parse_args()
+
+    baseline_ms = statistics.median(summarize(import_profile(None))[0] for _ in range(args.runs))
+    print(f"Interpreter start imports {baseline_ms:.1f} ms (subtracted below)")
+
+    over_budget = []
+    for name in args.functions or handler_names():
+        profiles = [import_profile(name) for _ in range(args.runs)]
+        if any(profile is None for profile in profiles):
+            over_budget.append(name)
+            continue
+
+        total_ms = statistics.median(summarize(profile)[0] for profile in profiles) - baseline_ms
+        loads_boto3 = summarize(profiles[0])[1]
+        print(f"{name:<24} {total_ms:>8.1f} ms{'  (imports boto3 at init)' if loads_boto3 else ''}")
+
+        slowest = sorted(profiles[0], key=lambda module: module[1], reverse=True)[:args.top]
+        for module, self_us, _, _ in slowest:
+            print(f"    {self_us / 1000:>8.1f} ms  {module}")
+
+        if args.budget_ms is not None and total_ms > args.budget_ms:
+            over_budget.append(name)
+
+    if over_budget:
+        print(f"Over budget or failed: {', '.join(over_budget)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
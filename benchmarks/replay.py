@@ -0,0 +1,484 @@
+"""
+Replay recorded invocations against each handler at simulated memory tiers.
+
+Events come from benchmarks/events/<function>.json: a list of API Gateway
+proxy events, as logged by the functions or captured from the console. The
+handlers run in-process against real boto3 clients whose HTTP layer is
+replaced by canned responses after a configurable service latency, so
+request signing, serialization and parsing cost what they cost in Lambda.
+Outbound HTTP (Turnstile, Google, JWKS) goes through the same stubbed
+latency. Tokens are signed once with a throwaway RSA key that the
+stubbed JWKS endpoints publish, so verification runs the real RS256 path.
+
+Lambda allocates CPU in proportion to memory, one full vCPU at 1769 MB. For
+each tier the measured CPU time of an invocation is stretched by
+1769 / memory (never below 1x: the handlers are effectively single
+threaded), the stubbed I/O time is kept as is, and the result is priced at
+the Lambda GB-second rate with 1 ms billing.
+
+CPU time on a shared machine is noisy, so the replay runs in several
+independent rounds. The recommendation is made from each tier's median p95
+and cost across rounds. Each function's line also reports how many rounds
+picked the same tier and the p95 range across rounds. A tier picked in
+fewer than --min-agreement of the rounds is flagged as unstable and should
+be re-run before it is used.
+
+Usage:
+    python benchmarks/replay.py [--iterations 50] [--rounds 5] [--memory 128 256 512 1024 1769]
+                                [--latency cognito-idp=45 dynamodb=8 http=60] [function ...]
+"""
+import argparse
+import base64
+import contextlib
+import hashlib
+import importlib.util
+import io
+import json
+import math
+import os
+import secrets
+import statistics
+import sys
+import time
+import uuid
+
+from cold_start import FAKE_ENVIRONMENT, FUNCTIONS_DIR, SHARED_DIR
+
+EVENTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'events')
+
+FULL_VCPU_MEMORY_MB = 1769
+
+# us-east-1 on-demand pricing
+PRICE_PER_GB_SECOND = {'x86_64': 0.0000166667, 'arm64': 0.0000133334}
+PRICE_PER_MILLION_REQUESTS = 0.20
+
+# Round trips as seen from Lambda in-region, in milliseconds
+DEFAULT_LATENCY_MS = {
+    'cognito-idp': 45,
+    'dynamodb': 8,
+    'sqs': 12,
+    'http': 60
+}
+
+# Replays reuse the same event many times: turn off caches that would
+# otherwise turn every replay after the first into a cache hit
+REPLAY_ENVIRONMENT = {
+    'TURNSTILE_CACHE_TTL_SECONDS': '0',
+    'USER_INFO_CACHE_TTL_SECONDS': '0',
+    'LOGIN_ACTIVITY_MODE': 'sync'
+}
+
+USER = {
+    'sub': '6f1c1f5e-1d7b-4c44-9d5e-0c3f1a2b3c4d',
+    'email': 'replay.user@example.com',
+    'name': 'Replay User'
+}
+
+
+def b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _is_probable_prime(n, rounds=32):
+    if n < 2:
+        return False
+    for p in (2, 3, 5, 7, 11, 13, 17, 19, 23, 29):
+        if n % p == 0:
+            return n == p
+    d, r = n - 1, 0
+    while d % 2 == 0:
+        d, r = d // 2, r + 1
+    for _ in range(rounds):
+        x = pow(secrets.randbelow(n - 3) + 2, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(r - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _random_prime(bits):
+    while True:
+        candidate = secrets.randbits(bits) | (1 << (bits - 1)) | 1
+        if _is_probable_prime(candidate):
+            return candidate
+
+
+class SigningKey:
+    """Throwaway RSA key for minting RS256 tokens the handlers will accept"""
+
+    def __init__(self, bits=2048, kid='replay'):
+        self.kid = kid
+        self.e = 65537
+        while True:
+            p, q = _random_prime(bits // 2), _random_prime(bits // 2)
+            phi = (p - 1) * (q - 1)
+            if p != q and math.gcd(self.e, phi) == 1:
+                break
+        self.n = p * q
+        self.d = pow(self.e, -1, phi)
+
+    def jwk(self):
+        return {
+            'kty': 'RSA', 'use': 'sig', 'alg': 'RS256', 'kid': self.kid,
+            'n': b64url(self.n.to_bytes((self.n.bit_length() + 7) // 8, 'big')),
+            'e': b64url(self.e.to_bytes(3, 'big'))
+        }
+
+    def sign(self, claims):
+        from jwt_verifier import _SHA256_DIGEST_INFO
+
+        header = b64url(json.dumps({'alg': 'RS256', 'kid': self.kid}).encode())
+        payload = b64url(json.dumps(claims).encode())
+        signing_input = f"{header}.{payload}".encode('ascii')
+
+        key_length = (self.n.bit_length() + 7) // 8
+        digest_info = _SHA256_DIGEST_INFO + hashlib.sha256(signing_input).digest()
+        encoded = b'\x00\x01' + b'\xff' * (key_length - len(digest_info) - 3) + b'\x00' + digest_info
+        signature = pow(int.from_bytes(encoded, 'big'), self.d, self.n).to_bytes(key_length, 'big')
+        return f"{header}.{payload}.{b64url(signature)}"
+
+
+class Tokens:
+    """
+    Cognito and Google tokens for USER, signed by a SigningKey
+
+    Tokens are minted once and reused (valid for an hour): signing with the
+    private exponent is expensive and would otherwise be billed to the
+    handler that asked the stub for them.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self._minted = {}
+
+    def _once(self, name, mint):
+        if name not in self._minted:
+            self._minted[name] = mint()
+        return self._minted[name]
+
+    def cognito(self, token_use):
+        return self._once(token_use, lambda: self._mint_cognito(token_use))
+
+    def _mint_cognito(self, token_use):
+        from jwt_verifier import cognito_issuer
+
+        now = int(time.time())
+        claims = {
+            'sub': USER['sub'], 'iss': cognito_issuer(), 'token_use': token_use,
+            'iat': now, 'exp': now + 3600
+        }
+        if token_use == 'access':
+            claims['client_id'] = os.environ['COGNITO_CLIENT_ID']
+            claims['username'] = USER['sub']
+        else:
+            claims.update(aud=os.environ['COGNITO_CLIENT_ID'], email=USER['email'],
+                          name=USER['name'], email_verified=True)
+        return self.key.sign(claims)
+
+    def google_id_token(self):
+        return self._once('google', self._mint_google_id_token)
+
+    def _mint_google_id_token(self):
+        now = int(time.time())
+        return self.key.sign({
+            'sub': '104' + USER['sub'].replace('-', '')[:18], 'iss': 'https://accounts.google.com',
+            'aud': os.environ['GOOGLE_CLIENT_ID'], 'email': USER['email'], 'email_verified': True,
+            'name': USER['name'], 'iat': now, 'exp': now + 3600
+        })
+
+    def authentication_result(self):
+        return {
+            'AccessToken': self.cognito('access'),
+            'IdToken': self.cognito('id'),
+            'RefreshToken': 'replay-refresh-' + secrets.token_urlsafe(32),
+            'ExpiresIn': 3600,
+            'TokenType': 'Bearer'
+        }
+
+
+def user_attributes(verified='true'):
+    return [
+        {'Name': 'sub', 'Value': USER['sub']},
+        {'Name': 'email', 'Value': USER['email']},
+        {'Name': 'email_verified', 'Value': verified},
+        {'Name': 'name', 'Value': USER['name']}
+    ]
+
+
+def aws_response(service, operation, params, tokens):
+    """Canned response body for an AWS API call (JSON protocol)"""
+    from aws_clients import serialize_item
+
+    if service == 'cognito-idp':
+        if operation == 'InitiateAuth' and params.get('AuthFlow') == 'CUSTOM_AUTH':
+            return {'ChallengeName': 'CUSTOM_CHALLENGE', 'Session': secrets.token_urlsafe(48),
+                    'ChallengeParameters': {'nonce': secrets.token_urlsafe(24)}}
+        if operation in ('InitiateAuth', 'RespondToAuthChallenge'):
+            return {'AuthenticationResult': tokens.authentication_result(), 'ChallengeParameters': {}}
+        if operation in ('GetUser', 'AdminGetUser'):
+            return {'Username': USER['sub'], 'UserAttributes': user_attributes(), 'Enabled': True,
+                    'UserStatus': 'CONFIRMED'}
+        if operation == 'SignUp':
+            return {'UserSub': str(uuid.uuid4()), 'UserConfirmed': False}
+        if operation == 'ForgotPassword':
+            return {'CodeDeliveryDetails': {'Destination': 'r***@e***', 'DeliveryMedium': 'EMAIL'}}
+        return {}
+
+    if service == 'dynamodb':
+        record = {'userId': USER['sub'], 'email': USER['email'], 'name': USER['name'],
+                  'verified': False, 'provider': 'Email', 'status': 'CONFIRMED'}
+        if operation == 'GetItem':
+            return {'Item': serialize_item(record)}
+        if operation == 'Query':
+            return {'Items': [serialize_item(record)], 'Count': 1}
+        if operation == 'UpdateItem':
+            return {'Attributes': serialize_item({'w0': 1})} if params.get('ReturnValues') == 'ALL_NEW' else {}
+        return {}
+
+    if service == 'sqs':
+        return {'MessageId': str(uuid.uuid4()), 'MD5OfMessageBody': '0' * 32}
+
+    return {}
+
+
+def http_response(method, url, tokens, key):
+    """Canned (status, body) for an outbound HTTP request"""
+    from oidc_metadata import get_provider
+
+    if 'turnstile' in url:
+        return 200, {'success': True, 'hostname': 'example.com', 'challenge_ts': '2024-01-01T00:00:00Z'}
+    if url.endswith('/.well-known/openid-configuration'):
+        google = get_provider('google')
+        return 200, dict(google['defaults'], issuer=google['issuer'])
+    if url.endswith('jwks.json') or url.endswith('/certs'):
+        return 200, {'keys': [key.jwk()]}
+    if 'token' in url and method == 'POST':
+        return 200, {'access_token': 'ya29.' + secrets.token_urlsafe(96), 'expires_in': 3599,
+                     'id_token': tokens.google_id_token(), 'token_type': 'Bearer'}
+    if 'userinfo' in url:
+        return 200, {'sub': '104', 'email': USER['email'], 'email_verified': True, 'name': USER['name']}
+    return 404, {}
+
+
+class RawBody:
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+class Stubs:
+    """Install latency-stubbed AWS and HTTP backends and count the time spent waiting on them"""
+
+    def __init__(self, latency_ms, tokens, key):
+        self.latency_ms = latency_ms
+        self.tokens = tokens
+        self.key = key
+
+    def _wait(self, service):
+        time.sleep(self.latency_ms.get(service, 0) / 1000)
+
+    def install(self, services=('cognito-idp', 'dynamodb', 'sqs')):
+        from botocore.awsrequest import AWSResponse
+        import aws_clients
+        import http_pool
+
+        def before_send(service):
+            def send(request, **kwargs):
+                operation = request.headers.get('X-Amz-Target', b'').decode().rsplit('.', 1)[-1]
+                params = json.loads(request.body or b'{}')
+                body = json.dumps(aws_response(service, operation, params, self.tokens)).encode()
+                self._wait(service)
+                return AWSResponse(request.url, 200, {'Content-Type': 'application/x-amz-json-1.1'}, RawBody(body))
+            return send
+
+        for service in services:
+            aws_clients.get_client(service).meta.events.register('before-send', before_send(service))
+
+        def request(method, url, body=None, headers=None, **kwargs):
+            status, payload = http_response(method, url, self.tokens, self.key)
+            self._wait('http')
+            return http_pool.HTTPResponse(status, {}, json.dumps(payload).encode())
+
+        http_pool.request = request
+
+
+class Context:
+    def __init__(self, function_name):
+        self.function_name = function_name
+        self.memory_limit_in_mb = FULL_VCPU_MEMORY_MB
+        self.aws_request_id = str(uuid.uuid4())
+
+    def get_remaining_time_in_millis(self):
+        return 15000
+
+
+def load_handler(name):
+    spec = importlib.util.spec_from_file_location(f"{name}_handler", os.path.join(FUNCTIONS_DIR, name, 'handler.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.lambda_handler
+
+
+def substitute(value, placeholders):
+    """Fill {{placeholder}} tokens in a recorded event with freshly signed values"""
+    if isinstance(value, str):
+        for name, make in placeholders.items():
+            token = '{{' + name + '}}'
+            if token in value:
+                value = value.replace(token, make())
+        return value
+    if isinstance(value, dict):
+        return {k: substitute(v, placeholders) for k, v in value.items()}
+    if isinstance(value, list):
+        return [substitute(v, placeholders) for v in value]
+    return value
+
+
+def replay(name, events, iterations, placeholders):
+    """
+    Run every event iterations times (after one untimed warm-up pass)
+
+    Returns:
+        list of (wall_ms, cpu_ms) per invocation
+    """
+    handler = load_handler(name)
+    samples = []
+    for iteration in range(iterations + 1):
+        for recorded in events:
+            event = substitute(recorded, placeholders)
+            with contextlib.redirect_stdout(io.StringIO()):
+                wall_started, cpu_started = time.perf_counter(), time.process_time()
+                response = handler(event, Context(name))
+            wall_ms = (time.perf_counter() - wall_started) * 1000
+            cpu_ms = (time.process_time() - cpu_started) * 1000
+            if iteration == 0 and response.get('statusCode', 500) >= 500:
+                print(f"{name}: replay returned {response.get('statusCode')}: {response.get('body')}", file=sys.stderr)
+            if iteration:
+                samples.append((wall_ms, cpu_ms))
+    return samples
+
+
+def at_memory(samples, memory_mb):
+    """Durations stretched to the CPU share of a memory tier"""
+    stretch = max(1.0, FULL_VCPU_MEMORY_MB / memory_mb)
+    return [wall + cpu * (stretch - 1) for wall, cpu in samples]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def cost_per_million(durations, memory_mb, architecture):
+    billed_seconds = statistics.mean(math.ceil(duration) for duration in durations) / 1000
+    return (billed_seconds * memory_mb / 1024 * PRICE_PER_GB_SECOND[architecture] * 1_000_000
+            + PRICE_PER_MILLION_REQUESTS)
+
+
+def recommend(rows, slack, tolerance_ms):
+    """Cheapest (memory_mb, p50, p95, cost) row within slack or tolerance_ms of the fastest p95"""
+    fastest_p95 = min(p95 for _, _, p95, _ in rows)
+    return min(
+        (row for row in rows if row[2] <= fastest_p95 * (1 + slack) or row[2] - fastest_p95 <= tolerance_ms),
+        key=lambda row: row[3]
+    )
+
+
+def measure(samples, memory_tiers, architecture):
+    """(memory_mb, p50, p95, cost per 1M) for each tier"""
+    rows = []
+    for memory_mb in memory_tiers:
+        durations = at_memory(samples, memory_mb)
+        rows.append((memory_mb, percentile(durations, 50), percentile(durations, 95),
+                     cost_per_million(durations, memory_mb, architecture)))
+    return rows
+
+
+def parse_latency(pairs):
+    latency = dict(DEFAULT_LATENCY_MS)
+    for pair in pairs or []:
+        service, _, ms = pair.partition('=')
+        latency[service] = float(ms)
+    return latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('functions', nargs='*', help='Functions to replay (default: every events file)')
+    parser.add_argument('--iterations', type=int, default=50, help='Timed passes over each events file per round')
+    parser.add_argument('--rounds', type=int, default=5, help='Independent replays per function')
+    parser.add_argument('--min-agreement', type=float, default=0.8,
+                        help='Share of rounds that must pick the recommended tier for it to count as stable')
+    parser.add_argument('--memory', type=int, nargs='+', default=[128, 256, 512, 1024, 1769],
+                        help='Memory tiers in MB')
+    parser.add_argument('--latency', nargs='+', metavar='SERVICE=MS',
+                        help=f"Override stubbed round trips (defaults: {DEFAULT_LATENCY_MS})")
+    parser.add_argument('--architecture', choices=sorted(PRICE_PER_GB_SECOND), default='x86_64')
+    parser.add_argument('--slack', type=float, default=0.10,
+                        help='Recommend the cheapest tier whose p95 is within this fraction of the fastest...')
+    parser.add_argument('--tolerance-ms', type=float, default=10,
+                        help='...or within this many milliseconds of it')
+    args = parser.parse_args()
+
+    os.environ.update(FAKE_ENVIRONMENT)
+    os.environ.update(REPLAY_ENVIRONMENT)
+    sys.path.insert(0, SHARED_DIR)
+
+    key = SigningKey()
+    tokens = Tokens(key)
+    Stubs(parse_latency(args.latency), tokens, key).install()
+    placeholders = {
+        'cognito_access_token': lambda: tokens.cognito('access'),
+        'cognito_id_token': lambda: tokens.cognito('id'),
+        'cognito_refresh_token': lambda: 'replay-refresh-' + secrets.token_urlsafe(32)
+    }
+
+    names = args.functions or sorted(f[:-5] for f in os.listdir(EVENTS_DIR) if f.endswith('.json'))
+    recommendations = {}
+
+    print(f"{'function':<22} {'memory':>7} {'p50 ms':>8} {'p95 ms':>8} {'p95 range':>15} {'cpu ms':>7} {'$ / 1M':>8}")
+    for name in names:
+        with open(os.path.join(EVENTS_DIR, f"{name}.json")) as f:
+            events = json.load(f)
+
+        rounds, cpu_ms = [], []
+        for _ in range(args.rounds):
+            samples = replay(name, events, args.iterations, placeholders)
+            rounds.append(measure(samples, args.memory, args.architecture))
+            cpu_ms.append(statistics.median(cpu for _, cpu in samples))
+
+        # Per tier, the median of each column across rounds
+        rows = [
+            (memory_mb, *(statistics.median(measured[index][column] for measured in rounds) for column in (1, 2, 3)))
+            for index, memory_mb in enumerate(args.memory)
+        ]
+        recommended = recommend(rows, args.slack, args.tolerance_ms)[0]
+        picks = [recommend(measured, args.slack, args.tolerance_ms)[0] for measured in rounds]
+        agreement = picks.count(recommended) / len(picks)
+        recommendations[name] = (recommended, picks, agreement)
+
+        for index, (memory_mb, p50, p95, cost) in enumerate(rows):
+            p95s = [measured[index][2] for measured in rounds]
+            p95_range = f"{min(p95s):.1f}-{max(p95s):.1f}"
+            marker = ' *' if memory_mb == recommended else ''
+            print(f"{name:<22} {memory_mb:>7} {p50:>8.1f} {p95:>8.1f} {p95_range:>15} "
+                  f"{statistics.median(cpu_ms):>7.1f} {cost:>8.2f}{marker}")
+
+    print(f"\n* cheapest tier within {args.slack:.0%} or {args.tolerance_ms:g} ms of the fastest median p95 "
+          f"over {args.rounds} rounds of {args.iterations}. Suggested local.lambda_functions values:")
+    for name, (memory_mb, picks, agreement) in recommendations.items():
+        stability = 'stable' if agreement >= args.min_agreement else 'UNSTABLE, re-run before using'
+        counts = ', '.join(f"{tier}x{picks.count(tier)}" for tier in sorted(set(picks)))
+        print(f"  {name:<20} memory_size = {memory_mb:<5} # picked in {picks.count(memory_mb)}/{len(picks)} "
+              f"rounds ({counts}), {stability}")
+
+
+if __name__ == '__main__':
+    main()
@@ -33,7 +33,26 @@ resource "aws_cloudwatch_log_metric_filter" "lambda_errors" {
 
   name           = "${var.project_name}-${var.environment}-${replace(each.key, "_", "-")}-errors"
   log_group_name = aws_cloudwatch_log_group.lambda_logs[each.key].name
-  pattern        = "ERROR"
+  pattern        = "{ $.level = \"ERROR\" }"
+
+  metric_transformation {
+    name      = "${var.project_name}-${var.environment}-${replace(each.key, "_", "-")}-errors"
+    namespace = "Lambda/Errors"
+    value     = "1"
+  }
+
+  depends_on = [aws_cloudwatch_log_group.lambda_logs]
+}
+
+# Failures that never reach structured_log.logged_handler (import errors and
+# other init failures, timeouts) are plain-text runtime lines; they feed the
+# same metric as the JSON ERROR lines above
+resource "aws_cloudwatch_log_metric_filter" "lambda_runtime_errors" {
+  for_each = local.lambda_functions
+
+  name           = "${var.project_name}-${var.environment}-${replace(each.key, "_", "-")}-runtime-errors"
+  log_group_name = aws_cloudwatch_log_group.lambda_logs[each.key].name
+  pattern        = "?\"[ERROR]\" ?\"Task timed out\""
 
   metric_transformation {
     name      = "${var.project_name}-${var.environment}-${replace(each.key, "_", "-")}-errors"
@@ -63,7 +82,10 @@ resource "aws_cloudwatch_metric_alarm" "lambda_error_alarm" {
     Project     = var.project_name
   }
 
-  depends_on = [aws_cloudwatch_log_metric_filter.lambda_errors]
+  depends_on = [
+    aws_cloudwatch_log_metric_filter.lambda_errors,
+    aws_cloudwatch_log_metric_filter.lambda_runtime_errors
+  ]
 }
 
 # CloudWatch Dashboard for Lambda Monitoring
@@ -56,7 +56,7 @@ resource "aws_cloudwatch_dashboard" "security_overview" {
         height = 6
 
         properties = {
-          query  = "SOURCE '/aws/lambda/${var.project_name}-${var.environment}-signin' | fields @timestamp\n| filter @message like /ERROR/\n| stats count() by bin(1h)\n| sort @timestamp desc"
+          query  = "SOURCE '/aws/lambda/${var.project_name}-${var.environment}-signin' | fields @timestamp\n| filter level = \"ERROR\" or @message like /\\[ERROR\\]|Task timed out/\n| stats count() by bin(1h)\n| sort @timestamp desc"
           region = var.aws_region
           title  = "Inactivity Logouts by IP"
           view   = "table"
@@ -70,7 +70,7 @@ resource "aws_cloudwatch_dashboard" "security_overview" {
         height = 8
 
         properties = {
-          query  = "SOURCE '/aws/lambda/${var.project_name}-${var.environment}-signin' | fields @timestamp\n| filter @message like /Incorrect username or password/\n| stats count() by bin(1h)\n| sort @timestamp desc"
+          query  = "SOURCE '/aws/lambda/${var.project_name}-${var.environment}-signin' | fields @timestamp\n| filter statusCode = 401\n| stats count() by bin(1h)\n| sort @timestamp desc"
           region = var.aws_region
           title  = "Top Failed Login IP Addresses"
           view   = "table"
@@ -169,7 +169,7 @@ resource "aws_cloudwatch_dashboard" "user_activity" {
         height = 8
 
         properties = {
-          query  = "SOURCE '/aws/lambda/${var.project_name}-${var.environment}-signin' | fields @timestamp\n| filter @message like /Sign in successful/\n| stats count() by bin(1h)\n| sort @timestamp desc"
+          query  = "SOURCE '/aws/lambda/${var.project_name}-${var.environment}-signin' | fields @timestamp, 1 / sampleRate as weight\n| filter outcome = \"success\"\n| stats sum(weight) by bin(1h)\n| sort @timestamp desc"
           region = var.aws_region
           title  = "Page Views by Route"
           view   = "table"
@@ -294,7 +294,7 @@ resource "aws_cloudwatch_dashboard" "system_health" {
         height = 6
 
         properties = {
-          query  = "SOURCE '/aws/lambda/${var.project_name}-${var.environment}-refresh' | fields @timestamp\n| filter @message like /successful/\n| stats count() by bin(1h)\n| sort @timestamp desc"
+          query  = "SOURCE '/aws/lambda/${var.project_name}-${var.environment}-refresh' | fields @timestamp, 1 / sampleRate as weight\n| filter outcome = \"success\"\n| stats sum(weight) by bin(1h)\n| sort @timestamp desc"
           region = var.aws_region
           title  = "Token Refresh Success Rate"
           view   = "timeSeries"
@@ -308,7 +308,7 @@ resource "aws_cloudwatch_dashboard" "system_health" {
         height = 6
 
         properties = {
-          query  = "SOURCE '/aws/lambda/${var.project_name}-${var.environment}-signin' | fields @timestamp, @message\n| filter @message like /ERROR/\n| sort @timestamp desc\n| limit 100"
+          query  = "SOURCE '/aws/lambda/${var.project_name}-${var.environment}-signin' | fields @timestamp, @message\n| filter level = \"ERROR\" or @message like /\\[ERROR\\]|Task timed out/\n| sort @timestamp desc\n| limit 100"
           region = var.aws_region
           title  = "Recent System Errors"
           view   = "table"
@@ -323,6 +323,83 @@ resource "aws_cloudwatch_dashboard" "system_health" {
   ]
 }
 
+# Dashboard 4: Dependency Latency
+# Fed by the EMF metrics every handler emits through structured_log.logged_handler
+locals {
+  metrics_namespace    = "${var.project_name}-${var.environment}"
+  latency_dependencies = ["Turnstile", "Cognito", "DynamoDB", "Google", "SQS"]
+}
+
+resource "aws_cloudwatch_dashboard" "dependency_latency" {
+  dashboard_name = "${var.project_name}-${var.environment}-dependency-latency"
+
+  dashboard_body = jsonencode({
+    widgets = concat(
+      [
+        for index, dependency in local.latency_dependencies : {
+          type   = "metric"
+          x      = (index % 3) * 8
+          y      = floor(index / 3) * 6
+          width  = 8
+          height = 6
+
+          properties = {
+            metrics = [
+              [local.metrics_namespace, "DependencyLatency", "Dependency", dependency, { stat = "p50", label = "p50" }],
+              ["...", { stat = "p95", label = "p95" }],
+              ["...", { stat = "p99", label = "p99" }]
+            ]
+            view   = "timeSeries"
+            region = var.aws_region
+            title  = "${dependency} Latency (ms)"
+            period = 300
+          }
+        }
+      ],
+      [
+        {
+          type   = "metric"
+          x      = 16
+          y      = 6
+          width  = 8
+          height = 6
+
+          properties = {
+            metrics = [
+              for dependency in ["Turnstile", "Cognito", "DynamoDB"] : [
+                local.metrics_namespace, "DependencyLatency", "Handler", "signin", "Dependency", dependency
+              ]
+            ]
+            view   = "timeSeries"
+            region = var.aws_region
+            title  = "Sign In p95 by Dependency (ms)"
+            period = 300
+            stat   = "p95"
+          }
+        },
+        {
+          type   = "metric"
+          x      = 0
+          y      = 12
+          width  = 24
+          height = 6
+
+          properties = {
+            metrics = [
+              [{ expression = "SEARCH('{${local.metrics_namespace},Handler} MetricName=\"ColdStart\"', 'Sum', 300)", id = "cold_starts" }]
+            ]
+            view    = "timeSeries"
+            stacked = true
+            region  = var.aws_region
+            title   = "Cold Starts by Handler"
+            period  = 300
+          }
+        }
+      ]
+    )
+  })
+}
+
 # Critical Security Alerts
 resource "aws_cloudwatch_metric_alarm" "failed_login_spike" {
   alarm_name          = "${var.project_name}-${var.environment}-failed-login-spike"
@@ -411,4 +488,9 @@ output "system_health_dashboard_url" {
   value       = "https://${var.aws_region}.console.aws.amazon.com/cloudwatch/home?region=${var.aws_region}#dashboards:name=${aws_cloudwatch_dashboard.system_health.dashboard_name}"
 }
 
+output "dependency_latency_dashboard_url" {
+  description = "URL of the Dependency Latency dashboard"
+  value       = "https://${var.aws_region}.console.aws.amazon.com/cloudwatch/home?region=${var.aws_region}#dashboards:name=${aws_cloudwatch_dashboard.dependency_latency.dashboard_name}"
+}
+
 # Dashboard URLs are available in the output values above
\ No newline at end of file
@@ -33,9 +33,12 @@ resource "aws_cognito_user_pool" "main" {
     allow_admin_create_user_only = false
   }
 
-  # Lambda triggers for custom messages
+  # Lambda triggers for custom messages and the federated (Google) CUSTOM_AUTH flow
   lambda_config {
-    custom_message = aws_lambda_function.custom_message.arn
+    custom_message                 = aws_lambda_function.custom_message.arn
+    define_auth_challenge          = aws_lambda_function.auth_challenge["define_auth_challenge"].arn
+    create_auth_challenge          = aws_lambda_function.auth_challenge["create_auth_challenge"].arn
+    verify_auth_challenge_response = aws_lambda_function.auth_challenge["verify_auth_challenge"].arn
   }
 
   account_recovery_setting {
@@ -86,7 +89,8 @@ resource "aws_cognito_user_pool_client" "main" {
   explicit_auth_flows = [
     "ALLOW_USER_PASSWORD_AUTH",
     "ALLOW_REFRESH_TOKEN_AUTH",
-    "ALLOW_ADMIN_USER_PASSWORD_AUTH"
+    "ALLOW_ADMIN_USER_PASSWORD_AUTH",
+    "ALLOW_CUSTOM_AUTH"
   ]
 
   # OAuth configuration for Google SSO
@@ -162,6 +166,12 @@ resource "aws_cognito_identity_provider" "google" {
   }
 }
 
+# Signs federated sign-in challenge answers (google_auth -> verify_auth_challenge)
+resource "random_password" "federated_auth_secret" {
+  length  = 64
+  special = false
+}
+
 # Cognito User Pool Domain for OAuth flows
 resource "aws_cognito_user_pool_domain" "main" {
   domain       = "${var.project_name}-${var.environment}-auth"
@@ -29,4 +29,41 @@ resource "aws_dynamodb_table" "users" {
     Environment = var.environment
     Project     = var.project_name
   }
-}
\ No newline at end of file
+}
+# Rate-limit counters, kept apart from user items so limiter writes stay small
+# and hot keys never touch the users table. Items expire through TTL.
+# The partition key is the hashed subject (IP or email), so a burst spreads
+# over many partitions; scope only has a handful of values and would pile
+# every counter of a limit onto one partition.
+resource "aws_dynamodb_table" "rate_limits" {
+  name         = "${var.project_name}-${var.environment}-rate-limits"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "subject"
+  range_key    = "scope"
+
+  attribute {
+    name = "subject"
+    type = "S"
+  }
+
+  attribute {
+    name = "scope"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  lifecycle {
+    prevent_destroy = false
+  }
+
+  deletion_protection_enabled = var.skip_destroy_dynamodb
+
+  tags = {
+    Environment = var.environment
+    Project     = var.project_name
+  }
+}
@@ -63,6 +63,7 @@ resource "aws_iam_policy" "lambda_cognito_access" {
           "cognito-idp:SignUp",
           "cognito-idp:ConfirmSignUp",
           "cognito-idp:InitiateAuth",
+          "cognito-idp:RespondToAuthChallenge",
           "cognito-idp:ForgotPassword",
           "cognito-idp:ConfirmForgotPassword",
           "cognito-idp:GetUser",
@@ -72,6 +73,7 @@ resource "aws_iam_policy" "lambda_cognito_access" {
           "cognito-idp:AdminSetUserAttributes",
           "cognito-idp:AdminCreateUser",
           "cognito-idp:AdminSetUserPassword",
+          "cognito-idp:AdminDeleteUser",
           "cognito-idp:ListUsers"
         ]
         Resource = aws_cognito_user_pool.main.arn
@@ -108,7 +110,8 @@ resource "aws_iam_policy" "lambda_dynamodb_access" {
         ]
         Resource = [
           aws_dynamodb_table.users.arn,
-          "${aws_dynamodb_table.users.arn}/index/*"
+          "${aws_dynamodb_table.users.arn}/index/*",
+          aws_dynamodb_table.rate_limits.arn
         ]
       }
     ]
@@ -120,6 +123,34 @@ resource "aws_iam_policy" "lambda_dynamodb_access" {
   }
 }
 
+# SQS Access Policy for the login activity pipeline
+resource "aws_iam_policy" "lambda_sqs_access" {
+  name        = "${var.project_name}-${var.environment}-lambda-sqs-access"
+  path        = "/"
+  description = "Policy for Lambda functions to publish and consume login activity events"
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "sqs:SendMessage",
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:GetQueueAttributes"
+        ]
+        Resource = aws_sqs_queue.login_activity.arn
+      }
+    ]
+  })
+
+  tags = {
+    Environment = var.environment
+    Project     = var.project_name
+  }
+}
+
 # CloudWatch Logging Policy for Lambda Functions
 resource "aws_iam_policy" "lambda_cloudwatch_logs" {
   name        = "${var.project_name}-${var.environment}-lambda-cloudwatch-logs"
@@ -170,6 +201,12 @@ resource "aws_iam_role_policy_attachment" "lambda_dynamodb_access" {
   policy_arn = aws_iam_policy.lambda_dynamodb_access.arn
 }
 
+# Attach SQS Access Policy to Lambda Role
+resource "aws_iam_role_policy_attachment" "lambda_sqs_access" {
+  role       = aws_iam_role.lambda_role.name
+  policy_arn = aws_iam_policy.lambda_sqs_access.arn
+}
+
 # Attach CloudWatch Logs Policy to Lambda Role
 resource "aws_iam_role_policy_attachment" "lambda_cloudwatch_logs" {
   role       = aws_iam_role.lambda_role.name
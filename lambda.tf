@@ -17,51 +17,84 @@ resource "aws_lambda_layer_version" "shared" {
   source_code_hash = data.archive_file.lambda_layer.output_base64sha256
 }
 
+# warm_strategy per function:
+#   none        - on-demand only, cold starts land on requests
+#   provisioned - "live" alias with provisioned concurrency, autoscaled on utilization
+#   snapstart   - "live" alias on a SnapStart-published version (init is snapshotted)
+# Override per function with var.lambda_warm_strategy_overrides; "provisioned"
+# falls back to "none" unless var.enable_provisioned_concurrency is set.
+#
+# memory_size also sets the CPU share (one vCPU at 1769 MB). Values come from
+# benchmarks/replay.py (5 rounds of 50): the cheapest tier within 10% / 10 ms
+# of the fastest median p95. Every pick held in at least 4 of 5 rounds except
+# user_info, which splits between 512 and 1024 and is kept at the larger tier.
 locals {
   lambda_functions = {
     signup = {
-      handler = "handler.lambda_handler"
-      timeout = 10
+      handler       = "handler.lambda_handler"
+      timeout       = 10
+      memory_size   = 512
+      warm_strategy = "none"
     }
     signin = {
-      handler = "handler.lambda_handler"
-      timeout = 10
+      handler       = "handler.lambda_handler"
+      timeout       = 10
+      memory_size   = 1024
+      warm_strategy = "provisioned"
     }
     verify = {
-      handler = "handler.lambda_handler"
-      timeout = 10
+      handler       = "handler.lambda_handler"
+      timeout       = 10
+      memory_size   = 1024
+      warm_strategy = "none"
     }
     forgot_password = {
-      handler = "handler.lambda_handler"
-      timeout = 10
+      handler       = "handler.lambda_handler"
+      timeout       = 10
+      memory_size   = 1024
+      warm_strategy = "none"
     }
     reset_password = {
-      handler = "handler.lambda_handler"
-      timeout = 10
+      handler       = "handler.lambda_handler"
+      timeout       = 10
+      memory_size   = 512
+      warm_strategy = "none"
     }
     resend_verification = {
-      handler = "handler.lambda_handler"
-      timeout = 10
+      handler       = "handler.lambda_handler"
+      timeout       = 10
+      memory_size   = 1024
+      warm_strategy = "none"
     }
     refresh = {
-      handler = "handler.lambda_handler"
-      timeout = 10
+      handler       = "handler.lambda_handler"
+      timeout       = 10
+      memory_size   = 512
+      warm_strategy = "provisioned"
     }
     logout = {
-      handler = "handler.lambda_handler"
-      timeout = 10
+      handler       = "handler.lambda_handler"
+      timeout       = 10
+      memory_size   = 128
+      warm_strategy = "none"
     }
     verify_token = {
-      handler = "handler.lambda_handler"
-      timeout = 10
+      handler       = "handler.lambda_handler"
+      timeout       = 10
+      memory_size   = 128
+      warm_strategy = "provisioned"
     }
     user_info = {
-      handler = "handler.lambda_handler"
-      timeout = 10
+      handler       = "handler.lambda_handler"
+      timeout       = 10
+      memory_size   = 1024
+      warm_strategy = "provisioned"
     }
     google_auth = {
-      handler = "handler.lambda_handler"
-      timeout = 15
+      handler       = "handler.lambda_handler"
+      timeout       = 15
+      memory_size   = 1024
+      warm_strategy = "provisioned"
     }
   }
 }
@@ -82,8 +115,9 @@ resource "aws_lambda_function" "custom_message" {
 
   environment {
     variables = {
-      PROJECT_NAME = var.project_name
-      ENVIRONMENT  = var.environment
+      PROJECT_NAME      = var.project_name
+      ENVIRONMENT       = var.environment
+      METRICS_NAMESPACE = "${var.project_name}-${var.environment}"
     }
   }
 
@@ -113,6 +147,64 @@ resource "aws_lambda_permission" "cognito_custom_message" {
   source_arn    = aws_cognito_user_pool.main.arn
 }
 
+# Cognito auth challenge triggers for federated (Google) sign-ins
+locals {
+  auth_challenge_triggers = toset([
+    "define_auth_challenge",
+    "create_auth_challenge",
+    "verify_auth_challenge"
+  ])
+}
+
+resource "aws_lambda_function" "auth_challenge" {
+  for_each = local.auth_challenge_triggers
+
+  filename      = data.archive_file.auth_challenge_lambda[each.key].output_path
+  function_name = "${var.project_name}-${var.environment}-${replace(each.key, "_", "-")}"
+  role          = aws_iam_role.lambda_role.arn
+  handler       = "handler.lambda_handler"
+  runtime       = "python3.12"
+  timeout       = 5
+  memory_size   = 128
+
+  source_code_hash = data.archive_file.auth_challenge_lambda[each.key].output_base64sha256
+
+  layers = [aws_lambda_layer_version.shared.arn]
+
+  environment {
+    variables = {
+      PROJECT_NAME          = var.project_name
+      ENVIRONMENT           = var.environment
+      METRICS_NAMESPACE     = "${var.project_name}-${var.environment}"
+      FEDERATED_AUTH_SECRET = each.key == "verify_auth_challenge" ? random_password.federated_auth_secret.result : ""
+    }
+  }
+
+  tags = {
+    Environment = var.environment
+    Project     = var.project_name
+  }
+}
+
+data "archive_file" "auth_challenge_lambda" {
+  for_each = local.auth_challenge_triggers
+
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_functions/${each.key}"
+  output_path = "${path.module}/lambda_functions/${each.key}/${each.key}.zip"
+  excludes    = ["__pycache__", "*.pyc", "${each.key}.zip"]
+}
+
+resource "aws_lambda_permission" "cognito_auth_challenge" {
+  for_each = local.auth_challenge_triggers
+
+  statement_id  = "AllowExecutionFromCognito"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.auth_challenge[each.key].function_name
+  principal     = "cognito-idp.amazonaws.com"
+  source_arn    = aws_cognito_user_pool.main.arn
+}
+
 # Archive Lambda functions with source code tracking
 data "archive_file" "lambda_functions" {
   for_each = local.lambda_functions
@@ -126,6 +218,27 @@ data "archive_file" "lambda_functions" {
 }
 
 
+locals {
+  lambda_warm_strategies = {
+    for name, config in local.lambda_functions : name => (
+      lookup(var.lambda_warm_strategy_overrides, name, config.warm_strategy) == "provisioned" && !var.enable_provisioned_concurrency
+      ? "none"
+      : lookup(var.lambda_warm_strategy_overrides, name, config.warm_strategy)
+    )
+  }
+  warm_lambda_functions        = { for name, strategy in local.lambda_warm_strategies : name => strategy if strategy != "none" }
+  provisioned_lambda_functions = { for name, strategy in local.lambda_warm_strategies : name => strategy if strategy == "provisioned" }
+
+  # API Gateway invokes the alias for warmed functions so requests land on
+  # the provisioned/snapshotted version
+  lambda_invoke_arns = {
+    for name in keys(local.lambda_functions) : name => try(
+      aws_lambda_alias.live[name].invoke_arn,
+      aws_lambda_function.auth_functions[name].invoke_arn
+    )
+  }
+}
+
 resource "aws_lambda_function" "auth_functions" {
   for_each = local.lambda_functions
 
@@ -135,30 +248,52 @@ resource "aws_lambda_function" "auth_functions" {
   handler       = each.value.handler
   runtime       = "python3.12"
   timeout       = each.value.timeout
-  memory_size   = 128
+  memory_size   = each.value.memory_size
 
   # This hash ensures Lambda only updates when the source code changes
   source_code_hash = data.archive_file.lambda_functions[each.key].output_base64sha256
 
+  # Warmed functions need published versions behind their "live" alias
+  publish = contains(keys(local.warm_lambda_functions), each.key)
+
+  dynamic "snap_start" {
+    for_each = local.lambda_warm_strategies[each.key] == "snapstart" ? [1] : []
+    content {
+      apply_on = "PublishedVersions"
+    }
+  }
+
   layers = [aws_lambda_layer_version.shared.arn]
 
   environment {
     variables = {
-      COGNITO_CLIENT_ID      = aws_cognito_user_pool_client.main.id
-      COGNITO_USER_POOL_ID   = aws_cognito_user_pool.main.id
-      USERS_TABLE            = aws_dynamodb_table.users.name
-      CORS_ALLOW_ORIGIN      = var.cors_allow_origin
-      CORS_ALLOW_HEADERS     = var.cors_allow_headers
-      CORS_ALLOW_METHODS     = var.cors_allow_methods
-      CORS_ALLOW_CREDENTIALS = var.cors_allow_credentials
-      PROJECT_NAME           = var.project_name
-      ENVIRONMENT            = var.environment
-      COGNITO_DOMAIN         = aws_cognito_user_pool_domain.main.domain
-      API_DOMAIN             = "${var.api_subdomain}.${var.root_domain}"
-      FRONTEND_DOMAIN        = var.root_domain
-      GOOGLE_CLIENT_ID       = var.google_client_id
-      GOOGLE_CLIENT_SECRET   = var.google_client_secret
-      TURNSTILE_SECRET_KEY   = var.turnstile_secret_key
+      COGNITO_CLIENT_ID           = aws_cognito_user_pool_client.main.id
+      COGNITO_USER_POOL_ID        = aws_cognito_user_pool.main.id
+      USERS_TABLE                 = aws_dynamodb_table.users.name
+      CORS_ALLOW_ORIGIN           = var.cors_allow_origin
+      CORS_ALLOW_HEADERS          = var.cors_allow_headers
+      CORS_ALLOW_METHODS          = var.cors_allow_methods
+      CORS_ALLOW_CREDENTIALS      = var.cors_allow_credentials
+      PROJECT_NAME                = var.project_name
+      ENVIRONMENT                 = var.environment
+      COGNITO_DOMAIN              = aws_cognito_user_pool_domain.main.domain
+      API_DOMAIN                  = "${var.api_subdomain}.${var.root_domain}"
+      FRONTEND_DOMAIN             = var.root_domain
+      GOOGLE_CLIENT_ID            = var.google_client_id
+      GOOGLE_CLIENT_SECRET        = var.google_client_secret
+      TURNSTILE_SECRET_KEY        = var.turnstile_secret_key
+      STRICT_TOKEN_VERIFICATION   = var.strict_token_verification
+      METRICS_NAMESPACE           = "${var.project_name}-${var.environment}"
+      USER_INFO_CACHE_TTL_SECONDS = var.user_info_cache_ttl_seconds
+      USERS_TABLE_CONSISTENT_READ = var.users_table_consistent_read
+      LOGIN_ACTIVITY_MODE         = var.login_activity_mode
+      LOGIN_ACTIVITY_QUEUE_URL    = aws_sqs_queue.login_activity.url
+      SPECULATIVE_SIGNUP          = var.speculative_signup
+      TURNSTILE_CACHE_TTL_SECONDS = var.turnstile_cache_ttl_seconds
+      FEDERATED_AUTH_SECRET       = each.key == "google_auth" ? random_password.federated_auth_secret.result : ""
+      OIDC_PROVIDERS              = jsonencode(var.oidc_providers)
+      RATE_LIMIT_TABLE            = aws_dynamodb_table.rate_limits.name
+      LOG_SUCCESS_SAMPLE_RATE     = var.log_success_sample_rate
     }
   }
 
@@ -174,6 +309,118 @@ resource "aws_lambda_permission" "api_gateway" {
   statement_id  = "AllowAPIGatewayInvoke"
   action        = "lambda:InvokeFunction"
   function_name = aws_lambda_function.auth_functions[each.key].function_name
+  qualifier     = try(aws_lambda_alias.live[each.key].name, null)
   principal     = "apigateway.amazonaws.com"
   source_arn    = "${aws_api_gateway_rest_api.main.execution_arn}/*/*"
-}
\ No newline at end of file
+}
+
+# Warm-start strategy: "live" alias tracking the latest published version
+resource "aws_lambda_alias" "live" {
+  for_each = local.warm_lambda_functions
+
+  name             = "live"
+  function_name    = aws_lambda_function.auth_functions[each.key].function_name
+  function_version = aws_lambda_function.auth_functions[each.key].version
+}
+
+# Provisioned concurrency is managed by Application Auto Scaling: min_capacity
+# environments are always initialised, more are added as utilization rises
+resource "aws_appautoscaling_target" "provisioned_concurrency" {
+  for_each = local.provisioned_lambda_functions
+
+  service_namespace  = "lambda"
+  resource_id        = "function:${aws_lambda_function.auth_functions[each.key].function_name}:${aws_lambda_alias.live[each.key].name}"
+  scalable_dimension = "lambda:function:ProvisionedConcurrency"
+  min_capacity       = var.provisioned_concurrency_min
+  max_capacity       = var.provisioned_concurrency_max
+}
+
+resource "aws_appautoscaling_policy" "provisioned_concurrency" {
+  for_each = local.provisioned_lambda_functions
+
+  name               = "${var.project_name}-${var.environment}-${replace(each.key, "_", "-")}-provisioned-concurrency"
+  policy_type        = "TargetTrackingScaling"
+  service_namespace  = aws_appautoscaling_target.provisioned_concurrency[each.key].service_namespace
+  resource_id        = aws_appautoscaling_target.provisioned_concurrency[each.key].resource_id
+  scalable_dimension = aws_appautoscaling_target.provisioned_concurrency[each.key].scalable_dimension
+
+  target_tracking_scaling_policy_configuration {
+    target_value = var.provisioned_concurrency_target_utilization
+
+    predefined_metric_specification {
+      predefined_metric_type = "LambdaProvisionedConcurrencyUtilization"
+    }
+  }
+}
+# Login activity consumer - applies deferred login events to the users table
+resource "aws_lambda_function" "login_activity_consumer" {
+  filename      = data.archive_file.login_activity_consumer_lambda.output_path
+  function_name = "${var.project_name}-${var.environment}-login-activity-consumer"
+  role          = aws_iam_role.lambda_role.arn
+  handler       = "handler.lambda_handler"
+  runtime       = "python3.12"
+  timeout       = 30
+  memory_size   = 128
+
+  source_code_hash = data.archive_file.login_activity_consumer_lambda.output_base64sha256
+
+  layers = [aws_lambda_layer_version.shared.arn]
+
+  environment {
+    variables = {
+      USERS_TABLE          = aws_dynamodb_table.users.name
+      COGNITO_USER_POOL_ID = aws_cognito_user_pool.main.id
+      PROJECT_NAME         = var.project_name
+      ENVIRONMENT          = var.environment
+      METRICS_NAMESPACE    = "${var.project_name}-${var.environment}"
+    }
+  }
+
+  tags = {
+    Environment = var.environment
+    Project     = var.project_name
+  }
+}
+
+# Archive for login activity consumer Lambda
+data "archive_file" "login_activity_consumer_lambda" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_functions/login_activity_consumer"
+  output_path = "${path.module}/lambda_functions/login_activity_consumer/login_activity_consumer.zip"
+  excludes    = ["__pycache__", "*.pyc", "login_activity_consumer.zip"]
+}
+
+# SQS delivery (login_activity_mode = "sqs")
+resource "aws_lambda_event_source_mapping" "login_activity_queue" {
+  event_source_arn                   = aws_sqs_queue.login_activity.arn
+  function_name                      = aws_lambda_function.login_activity_consumer.arn
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = 5
+  function_response_types            = ["ReportBatchItemFailures"]
+}
+
+# CloudWatch Logs delivery (login_activity_mode = "log")
+locals {
+  login_activity_producers = var.login_activity_mode == "log" ? toset(["signin", "google_auth"]) : toset([])
+}
+
+resource "aws_lambda_permission" "login_activity_logs" {
+  count = var.login_activity_mode == "log" ? 1 : 0
+
+  statement_id  = "AllowExecutionFromCloudWatchLogs"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.login_activity_consumer.function_name
+  principal     = "logs.amazonaws.com"
+  source_arn    = "arn:aws:logs:${var.aws_region}:${data.aws_caller_identity.current.account_id}:log-group:/aws/lambda/${var.project_name}-${var.environment}-*:*"
+}
+
+resource "aws_cloudwatch_log_subscription_filter" "login_activity" {
+  for_each = local.login_activity_producers
+
+  name            = "${var.project_name}-${var.environment}-${replace(each.key, "_", "-")}-login-activity"
+  log_group_name  = aws_cloudwatch_log_group.lambda_logs[each.key].name
+  filter_pattern  = "\"loginActivity\""
+  destination_arn = aws_lambda_function.login_activity_consumer.arn
+
+  depends_on = [aws_lambda_permission.login_activity_logs]
+}
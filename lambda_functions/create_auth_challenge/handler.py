@@ -0,0 +1,23 @@
+import secrets
+import sys
+
+sys.path.append('/opt')
+from federated_auth import FEDERATED_CHALLENGE
+from structured_log import logged_handler
+
+@logged_handler('create_auth_challenge')
+def lambda_handler(event, context):
+    """
+    Cognito Create Auth Challenge Trigger
+
+    Issues a single-use nonce for the federated sign-in challenge. The nonce
+    is returned to the caller and kept privately for verification, which
+    binds the expected answer to this authentication session.
+    """
+    if event['request'].get('challengeName') == 'CUSTOM_CHALLENGE':
+        nonce = secrets.token_urlsafe(32)
+        event['response']['publicChallengeParameters'] = {'nonce': nonce}
+        event['response']['privateChallengeParameters'] = {'nonce': nonce}
+        event['response']['challengeMetadata'] = FEDERATED_CHALLENGE
+
+    return event
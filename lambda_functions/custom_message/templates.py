@@ -0,0 +1,346 @@
+import argparse
+import html
+import re
+import sys
+import time
+from string import Template
+
+sys.path.append('/opt')
+from structured_log import log_event
+
+PROJECT_NAME = "Serverless Auth"  # You can make this dynamic
+DEFAULT_LOCALE = 'en'
+
+# Cognito rejects custom messages whose emailMessage is longer than this
+# (UTF-8 characters). Rendered HTML over the budget falls back to plain text.
+MESSAGE_SIZE_LIMIT = 20000
+
+# Longest value the username placeholder can take (email attribute, see cognito.tf)
+MAX_USERNAME_LENGTH = 256
+
+# Styles are inlined into style="" attributes at compile time: many mail
+# clients drop <style> blocks, and one copy per element is smaller than
+# repeating the whole stylesheet in every message.
+STYLES = {
+    'body': "font-family: Arial, sans-serif; line-height: 1.6; color: #333;",
+    'container': "max-width: 600px; margin: 0 auto; padding: 20px;",
+    'header': "background: linear-gradient(135deg, ${accent_from} 0%, ${accent_to} 100%); color: white; padding: 30px; text-align: center; border-radius: 8px 8px 0 0;",
+    'content': "background: #fff; padding: 30px; border: 1px solid #e2e8f0;",
+    'code': "font-size: ${code_size}; font-weight: bold; color: ${accent_to}; text-align: center; background: ${code_background}; padding: 20px; border-radius: 8px; margin: 20px 0;",
+    'warning': "background: #fef7f0; border: 1px solid #fed7aa; padding: 15px; border-radius: 8px; margin: 20px 0;",
+    'footer': "background: #f8fafc; padding: 20px; text-align: center; font-size: 14px; color: #64748b; border-radius: 0 0 8px 8px;"
+}
+
+THEMES = {
+    'green': {'accent_from': '#10b981', 'accent_to': '#059669', 'code_background': '#f0fdf4', 'code_size': '24px'},
+    'purple': {'accent_from': '#8b5cf6', 'accent_to': '#7c3aed', 'code_background': '#faf5ff', 'code_size': '20px'}
+}
+
+LAYOUT = '''
+<!DOCTYPE html>
+<html lang="${lang}">
+<head>
+    <meta charset="UTF-8">
+</head>
+<body class="body">
+    <div class="container">
+        <div class="header">
+            <h1>${project_name}</h1>
+            <p>${tagline}</p>
+        </div>
+        <div class="content">
+            ${content}
+        </div>
+        <div class="footer">
+            ${footer}
+            <p>© ${current_year} ${project_name}. ${rights}</p>
+        </div>
+    </div>
+</body>
+</html>
+'''
+
+# Strings shared by every message of a language
+COMMON = {
+    'en': {'rights': 'All rights reserved.'},
+    'es': {'rights': 'Todos los derechos reservados.'}
+}
+
+# Per trigger source and language. ${code} and ${username} are filled per
+# message; everything else is resolved when the template is compiled.
+# Every language must define the same trigger sources as DEFAULT_LOCALE.
+MESSAGES = {
+    'en': {
+        'CustomMessage_SignUp': {
+            'theme': 'green',
+            'subject': 'Welcome to ${project_name} - Verify Your Account',
+            'tagline': 'Welcome! Please verify your account',
+            'content': '''
+                <h2>Your Verification Code</h2>
+                <div class="code">${code}</div>
+                <p>Please enter this code in the verification page to complete your registration.</p>
+                <p><strong>This code expires in 24 hours.</strong></p>
+            ''',
+            'footer': "<p>If you didn't create an account, please ignore this email.</p>"
+        },
+        'CustomMessage_ForgotPassword': {
+            'theme': 'green',
+            'subject': '${project_name} - Password Reset Code',
+            'tagline': 'Password Reset Request',
+            'content': '''
+                <div class="warning">
+                    <h3>⚠️ Password Reset Requested</h3>
+                    <p>Someone requested a password reset for your account. If this wasn't you, please ignore this email.</p>
+                </div>
+                <h2>Your Reset Code</h2>
+                <div class="code">${code}</div>
+                <p>Use this code to reset your password. <strong>This code expires in 1 hour for security.</strong></p>
+                <h3>How to reset your password:</h3>
+                <ol>
+                    <li>Copy the code above</li>
+                    <li>Return to the password reset page</li>
+                    <li>Enter the code and your new password</li>
+                    <li>Click "Reset Password" to complete</li>
+                </ol>
+            ''',
+            'footer': '<p>For security, this code will expire in 1 hour.</p>'
+        },
+        'CustomMessage_AdminCreateUser': {
+            'theme': 'purple',
+            'subject': 'Welcome to ${project_name} - Set Up Your Account',
+            'tagline': 'Your account has been created',
+            'content': '''
+                <h2>Welcome to ${project_name}!</h2>
+                <p>An administrator has created an account for you. Please use the temporary password below to log in and set up your account.</p>
+                <div class="code">
+                    <strong>Username:</strong> ${username}<br>
+                    <strong>Temporary Password:</strong> ${code}
+                </div>
+                <p><strong>Important:</strong> You'll be required to change this password on your first login.</p>
+            ''',
+            'footer': '<p>Please log in within 7 days to activate your account.</p>'
+        },
+        'CustomMessage_ResendCode': {
+            'theme': 'green',
+            'subject': '${project_name} - New Verification Code',
+            'tagline': 'New Verification Code',
+            'content': '''
+                <h2>Your New Verification Code</h2>
+                <div class="code">${code}</div>
+                <p>You requested a new verification code. Please enter this code to complete your registration.</p>
+                <p><strong>This code expires in 24 hours.</strong></p>
+            ''',
+            'footer': "<p>If you didn't request this code, please ignore this email.</p>"
+        }
+    },
+    'es': {
+        'CustomMessage_SignUp': {
+            'theme': 'green',
+            'subject': 'Bienvenido a ${project_name} - Verifica tu cuenta',
+            'tagline': '¡Bienvenido! Verifica tu cuenta',
+            'content': '''
+                <h2>Tu código de verificación</h2>
+                <div class="code">${code}</div>
+                <p>Introduce este código en la página de verificación para completar tu registro.</p>
+                <p><strong>Este código caduca en 24 horas.</strong></p>
+            ''',
+            'footer': '<p>Si no has creado una cuenta, ignora este correo.</p>'
+        },
+        'CustomMessage_ForgotPassword': {
+            'theme': 'green',
+            'subject': '${project_name} - Código para restablecer tu contraseña',
+            'tagline': 'Solicitud de restablecimiento de contraseña',
+            'content': '''
+                <div class="warning">
+                    <h3>⚠️ Se ha solicitado restablecer la contraseña</h3>
+                    <p>Alguien ha solicitado restablecer la contraseña de tu cuenta. Si no has sido tú, ignora este correo.</p>
+                </div>
+                <h2>Tu código de restablecimiento</h2>
+                <div class="code">${code}</div>
+                <p>Usa este código para restablecer tu contraseña. <strong>Por seguridad, este código caduca en 1 hora.</strong></p>
+                <h3>Cómo restablecer tu contraseña:</h3>
+                <ol>
+                    <li>Copia el código de arriba</li>
+                    <li>Vuelve a la página de restablecimiento de contraseña</li>
+                    <li>Introduce el código y tu nueva contraseña</li>
+                    <li>Haz clic en "Restablecer contraseña" para terminar</li>
+                </ol>
+            ''',
+            'footer': '<p>Por seguridad, este código caducará en 1 hora.</p>'
+        },
+        'CustomMessage_AdminCreateUser': {
+            'theme': 'purple',
+            'subject': 'Bienvenido a ${project_name} - Configura tu cuenta',
+            'tagline': 'Se ha creado tu cuenta',
+            'content': '''
+                <h2>¡Bienvenido a ${project_name}!</h2>
+                <p>Un administrador ha creado una cuenta para ti. Usa la contraseña temporal de abajo para iniciar sesión y configurar tu cuenta.</p>
+                <div class="code">
+                    <strong>Usuario:</strong> ${username}<br>
+                    <strong>Contraseña temporal:</strong> ${code}
+                </div>
+                <p><strong>Importante:</strong> tendrás que cambiar esta contraseña la primera vez que inicies sesión.</p>
+            ''',
+            'footer': '<p>Inicia sesión en los próximos 7 días para activar tu cuenta.</p>'
+        },
+        'CustomMessage_ResendCode': {
+            'theme': 'green',
+            'subject': '${project_name} - Nuevo código de verificación',
+            'tagline': 'Nuevo código de verificación',
+            'content': '''
+                <h2>Tu nuevo código de verificación</h2>
+                <div class="code">${code}</div>
+                <p>Has solicitado un nuevo código de verificación. Introdúcelo para completar tu registro.</p>
+                <p><strong>Este código caduca en 24 horas.</strong></p>
+            ''',
+            'footer': '<p>Si no has solicitado este código, ignora este correo.</p>'
+        }
+    }
+}
+
+# (trigger_source, locale, year) -> (subject, html Template, text Template)
+_compiled = {}
+
+
+def _inline_styles(markup, theme):
+    """Replace class="name" with the matching inline style"""
+    def style(match):
+        return f'style="{Template(STYLES[match.group(1)]).substitute(theme)}"'
+    return re.sub(r'class="([a-z]+)"', style, markup)
+
+
+def _minify(markup):
+    """Drop indentation and whitespace between tags"""
+    markup = re.sub(r'>\s+<', '><', markup.strip())
+    markup = re.sub(r'\s+</', '</', markup)
+    return re.sub(r'\s+', ' ', markup)
+
+
+def _to_text(markup):
+    """Plain-text rendering of minified message HTML"""
+    text = re.sub(r'<br\s*/?>', '\n', markup)
+    text = re.sub(r'<li[^>]*>', '\n- ', text)
+    text = re.sub(r'</?(p|div|h[1-6]|ol|ul)(\s[^>]*)?>', '\n', text)
+    text = html.unescape(re.sub(r'<[^>]+>', '', text))
+    lines = [line.strip() for line in text.splitlines()]
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
+
+
+def _text_body(text):
+    """
+    Wrap the plain-text rendering for emailMessage
+
+    Cognito sends emailMessage as an HTML body, so bare newlines would
+    collapse into one run of text; <pre> keeps the line breaks.
+    """
+    return f'<pre style="font-family: Arial, sans-serif; white-space: pre-wrap;">{html.escape(text, quote=False)}</pre>'
+
+
+def compile_message(trigger_source, locale, year):
+    """
+    Build the subject, HTML and plain-text templates for one trigger source and locale
+
+    Static values (project name, year, styles, shared strings) are resolved
+    here; only the per-message ${code} and ${username} placeholders are left.
+
+    Returns:
+        tuple: (subject: str, html: string.Template, text: string.Template)
+    """
+    spec = MESSAGES[locale][trigger_source]
+    static = dict(COMMON[locale], project_name=PROJECT_NAME, current_year=year, lang=locale)
+
+    markup = Template(LAYOUT).safe_substitute(
+        tagline=spec['tagline'], content=spec['content'], footer=spec['footer']
+    )
+    markup = _minify(Template(markup).safe_substitute(static))
+    body = Template(_inline_styles(markup, THEMES[spec['theme']]))
+    text = Template(_text_body(_to_text(markup)))
+    return Template(spec['subject']).substitute(static), body, text
+
+
+def resolve_locale(locale):
+    """Map a Cognito locale attribute (e.g. 'es-MX') to a supported language"""
+    language = (locale or DEFAULT_LOCALE).replace('_', '-').split('-')[0].lower()
+    return language if language in MESSAGES else DEFAULT_LOCALE
+
+
+def render_message(trigger_source, code, username='', locale=None):
+    """
+    Render the email for a Cognito custom message trigger
+
+    Compiled templates are cached per container, so each message is a single
+    substitution of the code and username.
+
+    Args:
+        trigger_source: event['triggerSource']
+        code: event['request']['codeParameter'] (Cognito's placeholder, kept verbatim)
+        username: Shown in admin-created account emails
+        locale: The user's locale attribute, optional
+
+    Returns:
+        tuple: (subject, html) or None for trigger sources without a template
+    """
+    locale = resolve_locale(locale)
+    if trigger_source not in MESSAGES[locale]:
+        return None
+
+    key = (trigger_source, locale, time.gmtime().tm_year)
+    compiled = _compiled.get(key)
+    if compiled is None:
+        compiled = _compiled[key] = compile_message(*key)
+
+    subject, body, text = compiled
+    username = username or 'N/A'
+    message = body.substitute(code=code, username=html.escape(username))
+    if len(message) > MESSAGE_SIZE_LIMIT:
+        log_event(
+            'Email HTML over size limit, sending plain text', level='WARN',
+            triggerSource=trigger_source, locale=locale, length=len(message)
+        )
+        message = text.substitute(code=code, username=html.escape(username))
+    return subject, message
+
+
+def check_templates(code='{####}'):
+    """
+    Render every trigger source and locale at the worst-case username length
+
+    Returns:
+        tuple: (rows: list of (locale, trigger_source, html_length, text_length),
+                problems: list of str)
+    """
+    username = 'u' * MAX_USERNAME_LENGTH
+    rows, problems = [], []
+    for locale, messages in MESSAGES.items():
+        missing = set(MESSAGES[DEFAULT_LOCALE]) - set(messages)
+        if missing or locale not in COMMON:
+            problems.append(f"{locale}: missing {', '.join(sorted(missing)) or 'COMMON strings'}")
+        for trigger_source in messages:
+            _, body, text = compile_message(trigger_source, locale, 9999)
+            rendered = {
+                'HTML': body.substitute(code=code, username=username),
+                'text': text.substitute(code=code, username=username)
+            }
+            for name, message in rendered.items():
+                if code not in message:
+                    problems.append(f"{locale} {trigger_source}: {name} is missing the code placeholder")
+            if len(rendered['text']) > MESSAGE_SIZE_LIMIT:
+                problems.append(f"{locale} {trigger_source}: over {MESSAGE_SIZE_LIMIT} characters even as plain text")
+            rows.append((locale, trigger_source, len(rendered['HTML']), len(rendered['text'])))
+    return rows, problems
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Email template size budget')
+    parser.add_argument('--check', action='store_true', help='Exit non-zero if a template breaks the budget')
+    args = parser.parse_args()
+
+    rows, problems = check_templates()
+    print(f"{'locale':<7} {'trigger':<32} {'html':>6} {'text':>6}   (limit {MESSAGE_SIZE_LIMIT})")
+    for locale, trigger_source, html_length, text_length in rows:
+        fallback = '  -> plain text' if html_length > MESSAGE_SIZE_LIMIT else ''
+        print(f"{locale:<7} {trigger_source:<32} {html_length:>6} {text_length:>6}{fallback}")
+    for problem in problems:
+        print(f"ERROR: {problem}", file=sys.stderr)
+    if args.check and problems:
+        sys.exit(1)
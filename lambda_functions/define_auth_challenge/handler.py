@@ -0,0 +1,36 @@
+import sys
+
+sys.path.append('/opt')
+from federated_auth import FEDERATED_CHALLENGE
+from structured_log import logged_handler
+
+@logged_handler('define_auth_challenge')
+def lambda_handler(event, context):
+    """
+    Cognito Define Auth Challenge Trigger
+
+    Drives the CUSTOM_AUTH flow used by Google sign-ins: a single custom
+    challenge, answered with an HMAC proof by the google_auth Lambda.
+    Tokens are issued only after that challenge succeeds; a wrong answer
+    ends the session, there are no retries.
+    """
+    request = event['request']
+    session = request.get('session', [])
+    response = event['response']
+
+    response['issueTokens'] = False
+    response['failAuthentication'] = False
+
+    if request.get('userNotFound'):
+        response['failAuthentication'] = True
+    elif not session:
+        response['challengeName'] = 'CUSTOM_CHALLENGE'
+    elif (len(session) == 1
+          and session[0].get('challengeName') == 'CUSTOM_CHALLENGE'
+          and session[0].get('challengeMetadata') == FEDERATED_CHALLENGE
+          and session[0].get('challengeResult')):
+        response['issueTokens'] = True
+    else:
+        response['failAuthentication'] = True
+
+    return event
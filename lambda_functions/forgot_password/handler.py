@@ -1,14 +1,27 @@
 import json
-import boto3
 import os
 import sys
 from botocore.exceptions import ClientError
 
 sys.path.append('/opt')
 from utils import create_response, parse_body
+from aws_clients import lazy_client
+from rate_limiter import throttle
+from structured_log import logged_handler
 
-cognito_client = boto3.client('cognito-idp')
+cognito_client = lazy_client('cognito-idp')
 
+# Sliding-window limits checked before Cognito is called, each request
+# sends an email and draws on the shared Cognito quota. There is no bot
+# check here, so anyone can submit a victim's email: the tight limit is per
+# (email, IP), the per-email cap across IPs is looser, and email limits do
+# not count rejected requests, so nobody can hold a victim's reset closed.
+FORGOT_PASSWORD_WINDOW_SECONDS = 900
+FORGOT_PASSWORD_IP_LIMIT = int(os.environ.get('FORGOT_PASSWORD_IP_LIMIT', '10'))
+FORGOT_PASSWORD_EMAIL_LIMIT = int(os.environ.get('FORGOT_PASSWORD_EMAIL_LIMIT', '3'))
+FORGOT_PASSWORD_EMAIL_GLOBAL_LIMIT = int(os.environ.get('FORGOT_PASSWORD_EMAIL_GLOBAL_LIMIT', '10'))
+
+@logged_handler('forgot_password')
 def lambda_handler(event, context):
     try:
         body = parse_body(event)
@@ -20,6 +33,20 @@ def lambda_handler(event, context):
                 'error': 'Missing required field: email'
             })
         
+        client_ip = event.get('requestContext', {}).get('identity', {}).get('sourceIp')
+        
+        allowed, retry_after = throttle([
+            ('forgot_password_ip', client_ip, FORGOT_PASSWORD_IP_LIMIT, FORGOT_PASSWORD_WINDOW_SECONDS),
+            ('forgot_password_email_ip', f"{email.strip().lower()}|{client_ip or ''}",
+             FORGOT_PASSWORD_EMAIL_LIMIT, FORGOT_PASSWORD_WINDOW_SECONDS, False),
+            ('forgot_password_email', email, FORGOT_PASSWORD_EMAIL_GLOBAL_LIMIT, FORGOT_PASSWORD_WINDOW_SECONDS, False)
+        ])
+        if not allowed:
+            return create_response(429, {
+                'error': 'Too many password reset requests. Please try again later.',
+                'retryAfter': retry_after
+            })
+        
         client_id = os.environ['COGNITO_CLIENT_ID']
         
         try:
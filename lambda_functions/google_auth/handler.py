@@ -1,20 +1,30 @@
-import json
-import boto3
 import os
 import sys
 import urllib.parse
-import urllib.request
 from botocore.exceptions import ClientError
-from datetime import datetime, timezone
-import base64
 import secrets
 import string
 
 sys.path.append('/opt')
 from utils import create_response, create_cookie
+from aws_clients import lazy_client
+from auth_tokens import decode_token_payload
+from jwt_verifier import verify_google_id_token
+from federated_auth import sign_federated_challenge
+from login_activity import publish_login
+from concurrency import run_concurrently
+import http_pool
+from oidc_metadata import get_endpoint, prefetch_jwks
+from warmup import prewarm, warm_aws_call, warm_connection
+from structured_log import logged_handler, log_event
 
-cognito_client = boto3.client('cognito-idp')
-dynamodb = boto3.resource('dynamodb')
+cognito_client = lazy_client('cognito-idp')
+
+# The redirect waits for the post-auth fixup and login record: Lambda freezes
+# the container once the handler returns, so work left running would stall
+# until the next invocation or be lost. Only this much of the invocation is
+# kept back for answering, in case those writes run up against the timeout.
+GOOGLE_POST_AUTH_RESERVE_SECONDS = 1
 
 def generate_secure_password(length=32):
     """
@@ -55,80 +65,45 @@ def generate_secure_password(length=32):
     
     return ''.join(password)
 
-def decode_token_payload(token):
-    """Decode JWT token payload (second part)"""
-    try:
-        # JWT tokens have 3 parts separated by dots
-        parts = token.split('.')
-        if len(parts) != 3:
-            return None
-        
-        # Get the payload (middle part) and add padding if needed
-        payload = parts[1]
-        padding = len(payload) % 4
-        if padding:
-            payload += '=' * (4 - padding)
-            
-        decoded_bytes = base64.urlsafe_b64decode(payload)
-        decoded_str = decoded_bytes.decode('utf-8')
-        return json.loads(decoded_str)
-    except Exception:
-        return None
-
-def create_user_record(user_info, provider='Google'):
-    """Create user record in DynamoDB for Google OAuth users"""
-    try:
-        table = dynamodb.Table(os.environ['USERS_TABLE'])
-        
-        # Extract user information
-        user_id = user_info.get('sub')
-        email = user_info.get('email')
-        name = user_info.get('name', '')
-        
-        if not user_id or not email:
-            print(f"Missing required user info: user_id={user_id}, email={email}")
-            return False
-        
-        # Create user record - match existing table structure
-        user_record = {
-            'userId': user_id,
-            'email': email,
-            'name': name,
-            'verified': True,
-            'provider': provider,
-            'createdAt': datetime.now(timezone.utc).isoformat(),
-            'updatedAt': datetime.now(timezone.utc).isoformat(),
-            'lastLogin': datetime.now(timezone.utc).isoformat(),
-            'status': 'CONFIRMED'
-        }
-        
-        # Check if user already exists
-        try:
-            response = table.get_item(Key={'userId': user_id})
-            if 'Item' in response:
-                # User exists, update last login
-                table.update_item(
-                    Key={'userId': user_id},
-                    UpdateExpression='SET lastLogin = :lastLogin, updatedAt = :updatedAt',
-                    ExpressionAttributeValues={
-                        ':lastLogin': datetime.now(timezone.utc).isoformat(),
-                        ':updatedAt': datetime.now(timezone.utc).isoformat()
-                    }
-                )
-                print(f"Updated existing user record for {email}")
-                return True
-        except Exception as e:
-            print(f"Error checking existing user: {str(e)}")
-        
-        # Create new user record
-        table.put_item(Item=user_record)
-        print(f"Created user record for {email} with provider {provider}")
-        return True
-        
-    except Exception as e:
-        print(f"Error creating user record: {str(e)}")
+def needs_email_verification(cognito_user):
+    """
+    Whether an existing Cognito user still has an unverified email.
+    Google users should automatically have verified emails; users created by
+    this flow get email_verified='true' at admin_create_user already.
+    
+    Args:
+        cognito_user: admin_get_user response, or None for a user just created
+    """
+    if not cognito_user:
         return False
+    user_attributes = {attr['Name']: attr['Value'] for attr in cognito_user.get('UserAttributes', [])}
+    return user_attributes.get('email_verified') != 'true'
+
+def mark_email_verified(user_pool_id, username):
+    """Mark the user's email as verified (since it came from Google)"""
+    cognito_client.admin_set_user_attributes(
+        UserPoolId=user_pool_id,
+        Username=username,
+        UserAttributes=[
+            {
+                'Name': 'email_verified',
+                'Value': 'true'
+            }
+        ]
+    )
+
+def warm_google():
+    """Load Google's discovery document and JWKS and open the token endpoint connection"""
+    prefetch_jwks(get_endpoint('google', 'jwks_uri'))
+    warm_connection(get_endpoint('google', 'token_endpoint'))()
+
+# Runs only when Lambda initialises ahead of traffic (see shared/warmup.py)
+prewarm({
+    'cognito': warm_aws_call(lambda: cognito_client.get_user(AccessToken='warmup')),
+    'google': warm_google
+})
 
+@logged_handler('google_auth')
 def lambda_handler(event, context):
     """
     GOOGLE OAUTH AUTHENTICATION HANDLER
@@ -164,7 +139,7 @@ def lambda_handler(event, context):
             return initiate_google_auth()
         elif path.endswith('/google/callback') or 'code' in query_params:
             # Handle OAuth callback
-            return handle_google_callback(query_params)
+            return handle_google_callback(query_params, context)
         else:
             return create_response(400, {'error': 'Invalid Google OAuth endpoint'})
             
@@ -208,7 +183,7 @@ def initiate_google_auth():
         }
         
         # Build complete OAuth URL - direct to Google
-        oauth_url = "https://accounts.google.com/o/oauth2/v2/auth?" + urllib.parse.urlencode(oauth_params)
+        oauth_url = get_endpoint('google', 'authorization_endpoint') + "?" + urllib.parse.urlencode(oauth_params)
         
         # Redirect directly to Google OAuth
         return {
@@ -223,7 +198,116 @@ def initiate_google_auth():
     except Exception as e:
         return create_response(500, {'error': f'Failed to initiate Google auth: {str(e)}'})
 
-def handle_google_callback(query_params):
+def exchange_authorization_code(auth_code, google_client_id, google_client_secret):
+    """
+    Exchange the OAuth authorization code for Google tokens
+    
+    Returns:
+        tuple: (token_response: dict or None, error_message: str or None)
+    """
+    token_data = {
+        'client_id': google_client_id,
+        'client_secret': google_client_secret,
+        'code': auth_code,
+        'grant_type': 'authorization_code',
+        'redirect_uri': f"https://{os.environ.get('API_DOMAIN', 'api.filodelight.online')}/auth/google/callback"
+    }
+    
+    response = http_pool.request(
+        'POST',
+        get_endpoint('google', 'token_endpoint'),
+        body=urllib.parse.urlencode(token_data).encode(),
+        headers={'Content-Type': 'application/x-www-form-urlencoded'}
+    )
+    
+    if response.status != 200:
+        error_data = response.json() if response.status == 400 else {}
+        return None, error_data.get('error_description', 'OAuth token exchange failed')
+    
+    return response.json(), None
+
+def fetch_google_userinfo(google_access_token):
+    """Fetch the signed-in user's profile from Google's userinfo endpoint"""
+    response = http_pool.request(
+        'GET',
+        get_endpoint('google', 'userinfo_endpoint'),
+        headers={'Authorization': f"Bearer {google_access_token}"}
+    )
+    if response.status != 200:
+        raise RuntimeError(f"Google userinfo request failed with status {response.status}")
+    return response.json()
+
+def resolve_google_identity(google_access_token, google_id_token):
+    """
+    Identify the Google user behind the token exchange
+    
+    The id_token already carries sub, email, email_verified and name, so
+    once its signature and audience are verified locally no further request
+    to Google is needed. The userinfo endpoint is only used when Google did
+    not return an id_token.
+    
+    Returns:
+        tuple: (identity: dict or None, error_message: str or None)
+    """
+    if not google_id_token:
+        return fetch_google_userinfo(google_access_token), None
+    
+    claims, error = verify_google_id_token(google_id_token)
+    if error:
+        return None, f"Invalid Google ID token: {error}"
+    return claims, None
+
+def initiate_federated_auth(email):
+    """
+    Mint Cognito tokens for a Google-authenticated user
+    
+    Uses the CUSTOM_AUTH flow: the define/create/verify auth challenge
+    triggers issue a single-use nonce, answered here with an HMAC proof.
+    No password is involved, so returning users need no admin writes.
+    
+    Returns:
+        dict: AuthenticationResult with the Cognito tokens
+    """
+    cognito_client_id = os.environ['COGNITO_CLIENT_ID']
+    
+    challenge = cognito_client.initiate_auth(
+        ClientId=cognito_client_id,
+        AuthFlow='CUSTOM_AUTH',
+        AuthParameters={'USERNAME': email}
+    )
+    if challenge.get('ChallengeName') != 'CUSTOM_CHALLENGE':
+        raise RuntimeError(f"Unexpected challenge: {challenge.get('ChallengeName')}")
+    
+    nonce = challenge.get('ChallengeParameters', {}).get('nonce')
+    auth_response = cognito_client.respond_to_auth_challenge(
+        ClientId=cognito_client_id,
+        ChallengeName='CUSTOM_CHALLENGE',
+        Session=challenge['Session'],
+        ChallengeResponses={
+            'USERNAME': email,
+            'ANSWER': sign_federated_challenge(email, nonce)
+        }
+    )
+    return auth_response['AuthenticationResult']
+
+def find_cognito_user(user_pool_id, username):
+    """
+    Look up a Cognito user by username
+    
+    Returns:
+        dict: admin_get_user response, or None if the user does not exist
+    """
+    try:
+        return cognito_client.admin_get_user(
+            UserPoolId=user_pool_id,
+            Username=username
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'UserNotFoundException':
+            return None
+        raise
+
+def handle_google_callback(query_params, context=None):
     """
     HANDLE DIRECT GOOGLE OAUTH CALLBACK
     
@@ -233,11 +317,21 @@ def handle_google_callback(query_params):
     DIRECT CALLBACK FLOW:
     1. Extract authorization code from Google
     2. Exchange code for Google user info directly
-    3. Create/update Cognito user with Google info
-    4. Generate Cognito JWT tokens for the user
+    3. Create Cognito user with Google info on first sign-in
+    4. Generate Cognito JWT tokens for the user via the CUSTOM_AUTH challenge
     5. Create secure httpOnly cookies with tokens
     6. Redirect user to dashboard
     
+    PIPELINE:
+    Steps only wait on the steps they depend on. The Cognito user lookup
+    starts together with verification of Google's id_token (keyed by the
+    email it carries), and the login record runs after the tokens are
+    minted and is waited for before the redirect. The email verification
+    fixup joins it only when the admin_get_user attributes show an
+    unverified email. With LOGIN_ACTIVITY_MODE 'sqs' or 'log' the login
+    record is only a hand-off, so the redirect does not wait on DynamoDB.
+    All Google requests share pooled keep-alive connections.
+    
     ERROR HANDLING:
     - Invalid/expired authorization code → Redirect to signin with error
     - Google API errors → Show error page
@@ -258,25 +352,11 @@ def handle_google_callback(query_params):
             return redirect_with_error('Google OAuth not properly configured')
         
         # Exchange authorization code for Google access token
-        token_url = "https://oauth2.googleapis.com/token"
-        
-        token_data = {
-            'client_id': google_client_id,
-            'client_secret': google_client_secret,
-            'code': auth_code,
-            'grant_type': 'authorization_code',
-            'redirect_uri': f"https://{os.environ.get('API_DOMAIN', 'api.filodelight.online')}/auth/google/callback"
-        }
-        
-        # Make token exchange request to Google
-        token_request = urllib.request.Request(
-            token_url,
-            data=urllib.parse.urlencode(token_data).encode(),
-            headers={'Content-Type': 'application/x-www-form-urlencoded'}
+        google_token_response, exchange_error = exchange_authorization_code(
+            auth_code, google_client_id, google_client_secret
         )
-        
-        with urllib.request.urlopen(token_request) as response:
-            google_token_response = json.loads(response.read().decode())
+        if exchange_error:
+            return redirect_with_error(f'Google authentication failed: {exchange_error}')
         
         # Extract Google tokens
         google_access_token = google_token_response.get('access_token')
@@ -285,159 +365,146 @@ def handle_google_callback(query_params):
         if not google_access_token:
             return redirect_with_error('Failed to obtain Google access token')
         
-        # Get user info from Google
-        userinfo_url = f"https://www.googleapis.com/oauth2/v3/userinfo?access_token={google_access_token}"
+        user_pool_id = os.environ['COGNITO_USER_POOL_ID']
         
-        with urllib.request.urlopen(userinfo_url) as response:
-            google_user_info = json.loads(response.read().decode())
+        # The Cognito lookup does not have to wait for the id_token to be
+        # verified (a JWKS fetch on cold containers). The unverified email is
+        # only a prefetch hint: a mismatch falls back to a fresh lookup.
+        hinted_email = (decode_token_payload(google_id_token) or {}).get('email') if google_id_token else None
+        
+        lookup_calls = {'identity': lambda: resolve_google_identity(google_access_token, google_id_token)}
+        if hinted_email:
+            lookup_calls['cognito_user'] = lambda: find_cognito_user(user_pool_id, hinted_email)
+        lookups = run_concurrently(lookup_calls)
+        
+        # Get user info from the verified id_token (or userinfo without one)
+        identity_result, identity_call_error = lookups['identity']
+        google_user_info, identity_error = identity_result or (None, identity_call_error)
+        if identity_error:
+            log_event('Error resolving Google identity', level='ERROR', error=str(identity_error))
+            return redirect_with_error('Failed to obtain user information from Google')
         
         # Extract user information
         email = google_user_info.get('email')
         name = google_user_info.get('name', '')
         google_sub = google_user_info.get('sub')
-        email_verified = google_user_info.get('email_verified', True)
+        # The id_token carries a boolean; the userinfo endpoint may send a string
+        email_verified = google_user_info.get('email_verified') in (True, 'true')
         
         if not email or not google_sub:
             return redirect_with_error('Failed to obtain user information from Google')
         
+        # Accounts are matched by email, so an unverified Google address must
+        # never sign into the Cognito user that owns it
+        if not email_verified:
+            log_event('Google account email is not verified', level='WARN')
+            return redirect_with_error('Your Google account email is not verified')
+        
         # Create or get existing user in Cognito
-        user_pool_id = os.environ['COGNITO_USER_POOL_ID']
         # Use email as username since Cognito is configured for email-based usernames
         cognito_username = email
         
-        # Generate secure random password for this user
-        # Each Google OAuth user gets a unique, cryptographically secure password
-        # This password is never exposed and only used for internal Cognito operations
-        user_secure_password = generate_secure_password()
+        if hinted_email == cognito_username:
+            cognito_user, lookup_error = lookups['cognito_user']
+        else:
+            try:
+                cognito_user, lookup_error = find_cognito_user(user_pool_id, cognito_username), None
+            except ClientError as e:
+                cognito_user, lookup_error = None, e
         
-        # Store password temporarily in memory for auth flow
-        # This ensures we can authenticate the user after creation
-        cognito_user_password = None
+        if lookup_error:
+            log_event('Error getting Cognito user', level='ERROR', error=str(lookup_error))
+            return redirect_with_error('Error accessing user account')
         
-        try:
-            # Try to get existing user
-            cognito_response = cognito_client.admin_get_user(
-                UserPoolId=user_pool_id,
-                Username=cognito_username
-            )
-            print(f"Found existing Cognito user for Google account: {email}")
-            
-            # For existing users, we need to retrieve or regenerate their password
-            # Since we can't retrieve the original password, we'll reset it
-            new_password = generate_secure_password()
+        if cognito_user:
+            # Existing users sign in through the custom challenge, their password is left alone
+            log_event('Found existing Cognito user for Google account')
+        else:
+            # Create new user in Cognito with secure random passwords
             try:
+                # Generate unique temporary password for initial creation
+                temp_password = generate_secure_password(length=24)
+                
+                cognito_client.admin_create_user(
+                    UserPoolId=user_pool_id,
+                    Username=cognito_username,
+                    UserAttributes=[
+                        {'Name': 'email', 'Value': email},
+                        {'Name': 'name', 'Value': name},
+                        {'Name': 'email_verified', 'Value': 'true'}
+                    ],
+                    MessageAction='SUPPRESS',  # Don't send welcome email
+                    TemporaryPassword=temp_password,  # Secure temporary password
+                )
+                
+                # Set a permanent password once so the account leaves FORCE_CHANGE_PASSWORD
+                # (user won't use this since they sign in with Google)
                 cognito_client.admin_set_user_password(
                     UserPoolId=user_pool_id,
                     Username=cognito_username,
-                    Password=new_password,
+                    Password=generate_secure_password(),  # Unique secure password for this user
                     Permanent=True
                 )
-                cognito_user_password = new_password
-                print(f"Reset password for existing Google OAuth user: {email}")
-            except Exception as reset_error:
-                print(f"Error resetting password for existing user: {str(reset_error)}")
-                return redirect_with_error('Failed to update user credentials')
                 
-        except ClientError as e:
-            if e.response['Error']['Code'] == 'UserNotFoundException':
-                # Create new user in Cognito with secure random passwords
-                try:
-                    # Generate unique temporary password for initial creation
-                    temp_password = generate_secure_password(length=24)
-                    
-                    cognito_client.admin_create_user(
-                        UserPoolId=user_pool_id,
-                        Username=cognito_username,
-                        UserAttributes=[
-                            {'Name': 'email', 'Value': email},
-                            {'Name': 'name', 'Value': name},
-                            {'Name': 'email_verified', 'Value': 'true'}
-                        ],
-                        MessageAction='SUPPRESS',  # Don't send welcome email
-                        TemporaryPassword=temp_password,  # Secure temporary password
-                    )
-                    
-                    # Set permanent secure password (user won't use this since they use Google OAuth)
-                    cognito_client.admin_set_user_password(
-                        UserPoolId=user_pool_id,
-                        Username=cognito_username,
-                        Password=user_secure_password,  # Unique secure password for this user
-                        Permanent=True
-                    )
-                    
-                    cognito_user_password = user_secure_password
-                    print(f"Created new Cognito user for Google account: {email} with secure password")
-                except Exception as create_error:
-                    print(f"Error creating Cognito user: {str(create_error)}")
-                    return redirect_with_error('Failed to create user account')
-            else:
-                print(f"Error getting Cognito user: {str(e)}")
-                return redirect_with_error('Error accessing user account')
-        
-        # Verify we have a password to use for authentication
-        if not cognito_user_password:
-            print("Error: No password available for Cognito authentication")
-            return redirect_with_error('Authentication configuration error')
+                log_event('Created new Cognito user for Google account')
+            except Exception as create_error:
+                log_event('Error creating Cognito user', level='ERROR', error=str(create_error))
+                return redirect_with_error('Failed to create user account')
         
         # Generate Cognito JWT tokens for the user
         try:
-            cognito_client_id = os.environ['COGNITO_CLIENT_ID']
-            auth_response = cognito_client.admin_initiate_auth(
-                UserPoolId=user_pool_id,
-                ClientId=cognito_client_id,
-                AuthFlow='ADMIN_NO_SRP_AUTH',
-                AuthParameters={
-                    'USERNAME': cognito_username,
-                    'PASSWORD': cognito_user_password  # Use the secure password we generated
-                }
-            )
+            auth_result = initiate_federated_auth(cognito_username)
             
             # Extract Cognito JWT tokens
-            auth_result = auth_response['AuthenticationResult']
             access_token = auth_result['AccessToken']
             id_token = auth_result['IdToken']
             refresh_token = auth_result.get('RefreshToken')
             expires_in = auth_result.get('ExpiresIn', 3600)
             
         except Exception as auth_error:
-            print(f"Error generating Cognito tokens: {str(auth_error)}")
+            log_event('Error generating Cognito tokens', level='ERROR', error=str(auth_error))
             return redirect_with_error('Failed to generate authentication tokens')
         
         if not all([access_token, id_token]):
             return redirect_with_error('Failed to obtain authentication tokens')
         
-        # For Google OAuth users, ensure email is verified
-        # Google users should automatically have verified emails
-        try:
-            # Get user info to check if email verification is needed
-            response = cognito_client.get_user(AccessToken=access_token)
-            user_attributes = {attr['Name']: attr['Value'] for attr in response.get('UserAttributes', [])}
-            
-            # If email is not verified, verify it (since it came from Google)
-            if user_attributes.get('email_verified') != 'true':
-                cognito_client.admin_set_user_attributes(
-                    UserPoolId=os.environ['COGNITO_USER_POOL_ID'],
-                    Username=user_attributes.get('sub') or user_attributes.get('username'),
-                    UserAttributes=[
-                        {
-                            'Name': 'email_verified',
-                            'Value': 'true'
-                        }
-                    ]
-                )
-        except Exception as e:
+        # Decode ID token to get user information for the DynamoDB record
+        user_info = decode_token_payload(id_token)
+        
+        # The email verification fixup and the DynamoDB record are independent, run them together.
+        # The fixup is decided from the admin_get_user attributes already in hand, so
+        # verified users (and users created above) cost no extra Cognito call.
+        post_auth_calls = {}
+        if needs_email_verification(cognito_user):
+            post_auth_calls['email_verified'] = lambda: mark_email_verified(user_pool_id, cognito_username)
+        if user_info:
+            # Create user record in DynamoDB (existing records keep their original provider)
+            # Written inline or handed to the async pipeline depending on LOGIN_ACTIVITY_MODE
+            post_auth_calls['user_record'] = lambda: publish_login(
+                user_info.get('sub'),
+                user_info.get('email'),
+                name=user_info.get('name', ''),
+                provider='Google',
+                update_provider=False
+            )
+        else:
+            log_event('Could not decode ID token for user info', level='WARN')
+        
+        post_auth_timeout = None
+        if context is not None:
+            remaining_seconds = context.get_remaining_time_in_millis() / 1000
+            post_auth_timeout = max(0.1, remaining_seconds - GOOGLE_POST_AUTH_RESERVE_SECONDS)
+        results = run_concurrently(post_auth_calls, timeout=post_auth_timeout)
+        
+        _, verify_error = results.get('email_verified', (None, None))
+        if verify_error:
             # Log the error but continue - this shouldn't break the login flow
-            print(f"Warning: Could not verify email for Google user: {str(e)}")
+            log_event('Could not verify email for Google user', level='WARN', error=str(verify_error))
         
-        # Decode ID token to get user information and create DynamoDB record
-        user_info = decode_token_payload(id_token)
         if user_info:
-            # Create user record in DynamoDB
-            create_success = create_user_record(user_info, provider='Google')
+            create_success, _ = results['user_record']
             if not create_success:
-                print("Warning: Failed to create user record in DynamoDB")
-        else:
-            print("Warning: Could not decode ID token for user info")
+                log_event('Failed to create user record', level='WARN')
         
         # Create secure httpOnly cookies
         cookies = [
@@ -452,9 +519,6 @@ def handle_google_callback(query_params):
         # Redirect to dashboard with success
         frontend_domain = os.environ.get('FRONTEND_DOMAIN', 'filodelight.online')
         
-        print(f"Google OAuth successful for user: {user_info.get('email') if user_info else 'unknown'}")
-        print(f"Setting cookies and redirecting to: https://{frontend_domain}/dashboard")
-        
         return {
             'statusCode': 302,
             'headers': {
@@ -479,10 +543,8 @@ def handle_google_callback(query_params):
             </body></html>'''
         }
         
-    except urllib.error.HTTPError as e:
-        error_data = json.loads(e.read().decode()) if e.code == 400 else {}
-        error_msg = error_data.get('error_description', 'OAuth token exchange failed')
-        return redirect_with_error(f'Google authentication failed: {error_msg}')
+    except http_pool.TransportError as e:
+        return redirect_with_error(f'Google authentication failed: {str(e)}')
     except Exception as e:
         return redirect_with_error(f'Authentication error: {str(e)}')
 
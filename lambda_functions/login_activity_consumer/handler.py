@@ -0,0 +1,51 @@
+import json
+import sys
+
+sys.path.append('/opt')
+from login_activity import apply_login_events, events_from_log_subscription
+from structured_log import logged_handler, log_event
+
+@logged_handler('login_activity_consumer')
+def lambda_handler(event, context):
+    """
+    LOGIN ACTIVITY CONSUMER
+
+    Applies login events published by signin and google_auth when
+    LOGIN_ACTIVITY_MODE is 'sqs' or 'log', keeping DynamoDB writes off
+    the sign-in critical path.
+
+    EVENT SOURCES:
+    - SQS batch: returns batchItemFailures so only failed messages are retried
+    - CloudWatch Logs subscription: failures raise so the delivery is retried
+    """
+    if 'awslogs' in event:
+        login_events = events_from_log_subscription(event)
+        failed_users = apply_login_events(login_events)
+        if failed_users:
+            raise RuntimeError(f"Failed to apply login activity for {len(failed_users)} users")
+        return {'applied': len(login_events)}
+
+    message_ids_by_user = {}
+    login_events = []
+    batch_item_failures = []
+
+    for record in event.get('Records', []):
+        try:
+            login_event = json.loads(record['body'])
+            if not login_event.get('userId') or not login_event.get('at'):
+                raise ValueError('Login event without userId or at')
+            message_ids_by_user.setdefault(login_event['userId'], []).append(record['messageId'])
+            login_events.append(login_event)
+        except (ValueError, KeyError):
+            # Malformed messages are dropped, retrying would never succeed
+            log_event('Skipping malformed login activity message', level='WARN', messageId=record.get('messageId'))
+
+    failed_users = apply_login_events(login_events)
+    for user_id in failed_users:
+        for message_id in message_ids_by_user.get(user_id, []):
+            batch_item_failures.append({'itemIdentifier': message_id})
+
+    if batch_item_failures:
+        log_event('Failed to apply login activity', level='ERROR', users=len(failed_users))
+
+    return {'batchItemFailures': batch_item_failures}
@@ -1,12 +1,13 @@
 import json
-import boto3
 import os
 import sys
 from botocore.exceptions import ClientError
 
 sys.path.append('/opt')
 from utils import create_response, create_cookie
+from structured_log import logged_handler
 
+@logged_handler('logout')
 def lambda_handler(event, context):
     """
     Logout handler - clears httpOnly cookies by setting them with expired timestamps
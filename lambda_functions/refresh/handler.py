@@ -1,27 +1,27 @@
 import json
-import boto3
 import os
 import sys
 from botocore.exceptions import ClientError
 
 sys.path.append('/opt')
 from utils import create_response, parse_body, create_cookie
+from aws_clients import lazy_client
+from auth_tokens import parse_cookies
+from warmup import prewarm, warm_aws_call
+from structured_log import logged_handler
 
-cognito_client = boto3.client('cognito-idp')
+cognito_client = lazy_client('cognito-idp')
 
+# Runs only when Lambda initialises ahead of traffic (see shared/warmup.py)
+prewarm({
+    'cognito': warm_aws_call(lambda: cognito_client.get_user(AccessToken='warmup'))
+})
+
+@logged_handler('refresh')
 def lambda_handler(event, context):
     try:
         # Try to get refresh token from cookie first, then fall back to body
-        cookies = event.get('headers', {}).get('Cookie', '')
-        refresh_token = None
-        
-        # Parse cookies to find refreshToken
-        if cookies:
-            for cookie in cookies.split(';'):
-                cookie = cookie.strip()
-                if cookie.startswith('refreshToken='):
-                    refresh_token = cookie.split('=', 1)[1]
-                    break
+        refresh_token = parse_cookies(event).get('refreshToken')
         
         # Fall back to body if not in cookies (for backward compatibility)
         if not refresh_token:
@@ -1,5 +1,4 @@
 import json
-import boto3
 import os
 import sys
 import time
@@ -7,10 +6,18 @@ from botocore.exceptions import ClientError
 
 sys.path.append('/opt')
 from utils import create_response, parse_body
+from aws_clients import lazy_client
+from user_store import find_user_by_email
+from rate_limiter import acquire_cooldown_slot
+from structured_log import logged_handler, log_event
 
-cognito_client = boto3.client('cognito-idp')
-dynamodb = boto3.resource('dynamodb')
+# 60 seconds between codes, at most 5 codes per day
+RESEND_COOLDOWN_SECONDS = 60
+RESEND_DAILY_LIMIT = 5
 
+cognito_client = lazy_client('cognito-idp')
+
+@logged_handler('resend_verification')
 def lambda_handler(event, context):
     try:
         body = parse_body(event)
@@ -25,59 +32,43 @@ def lambda_handler(event, context):
         client_id = os.environ['COGNITO_CLIENT_ID']
         
         # Check rate limiting in DynamoDB
-        table = dynamodb.Table(os.environ['USERS_TABLE'])
-        
         try:
             # Query user record by email using GSI
-            response = table.query(
-                IndexName='EmailIndex',
-                KeyConditionExpression='email = :email',
-                ExpressionAttributeValues={':email': email}
-            )
+            user_record = find_user_by_email(email, fields=['verified'])
             
-            if not response['Items']:
+            if not user_record:
                 return create_response(404, {
                     'error': 'User not found'
                 })
             
-            user_item = response['Items'][0]
-            user_id = user_item['userId']
-            current_time = int(time.time())
-            
             # Check if user is already verified
-            if user_item.get('verified', False):
+            if user_record.verified:
                 return create_response(400, {
                     'error': 'Email is already verified'
                 })
             
-            # Rate limiting: Allow resend only after 60 seconds
-            last_resend_time = user_item.get('lastResendTime', 0)
-            time_diff = current_time - last_resend_time
+            # Cooldown and daily limit are checked and consumed in one conditional write
+            allowed, retry_after, reason = acquire_cooldown_slot(
+                'resend_verification',
+                email,
+                cooldown_seconds=RESEND_COOLDOWN_SECONDS,
+                daily_limit=RESEND_DAILY_LIMIT
+            )
             
-            if time_diff < 60:  # 60 seconds cooldown
-                remaining_time = 60 - time_diff
+            if reason == 'cooldown':
                 return create_response(429, {
-                    'error': f'Please wait {remaining_time} seconds before requesting another code',
-                    'remainingTime': remaining_time
+                    'error': f'Please wait {retry_after} seconds before requesting another code',
+                    'remainingTime': retry_after
                 })
             
-            # Check daily limit (max 5 resends per day)
-            resend_count_today = user_item.get('resendCountToday', 0)
-            last_resend_date = user_item.get('lastResendDate', '')
-            today = time.strftime('%Y-%m-%d')
-            
-            if last_resend_date != today:
-                # Reset daily count if it's a new day
-                resend_count_today = 0
-            
-            if resend_count_today >= 5:
+            if reason == 'daily_limit':
                 return create_response(429, {
-                    'error': 'Daily limit exceeded. Maximum 5 verification codes per day.',
+                    'error': f'Daily limit exceeded. Maximum {RESEND_DAILY_LIMIT} verification codes per day.',
                     'dailyLimitExceeded': True
                 })
             
         except ClientError as e:
-            print(f"DynamoDB error: {str(e)}")
+            log_event('DynamoDB error', level='ERROR', error=str(e))
             return create_response(500, {
                 'error': 'Failed to check rate limits'
             })
@@ -89,20 +80,9 @@ def lambda_handler(event, context):
                 Username=email
             )
             
-            # Update rate limiting data in DynamoDB
-            table.update_item(
-                Key={'userId': user_id},
-                UpdateExpression='SET lastResendTime = :time, resendCountToday = :count, lastResendDate = :date',
-                ExpressionAttributeValues={
-                    ':time': current_time,
-                    ':count': resend_count_today + 1,
-                    ':date': today
-                }
-            )
-            
             return create_response(200, {
                 'message': 'Verification code sent successfully',
-                'nextResendAvailable': current_time + 60  # Next resend available after 60 seconds
+                'nextResendAvailable': int(time.time()) + RESEND_COOLDOWN_SECONDS
             })
             
         except ClientError as e:
@@ -117,5 +97,5 @@ def lambda_handler(event, context):
                 return create_response(400, {'error': str(e)})
                 
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+        log_event('Unexpected error', level='ERROR', error=str(e))
         return create_response(500, {'error': f'Internal server error: {str(e)}'})
\ No newline at end of file
@@ -1,14 +1,16 @@
 import json
-import boto3
 import os
 import sys
 from botocore.exceptions import ClientError
 
 sys.path.append('/opt')
 from utils import create_response, parse_body
+from aws_clients import lazy_client
+from structured_log import logged_handler
 
-cognito_client = boto3.client('cognito-idp')
+cognito_client = lazy_client('cognito-idp')
 
+@logged_handler('reset_password')
 def lambda_handler(event, context):
     try:
         body = parse_body(event)
@@ -0,0 +1,86 @@
+import base64
+import json
+from functools import lru_cache
+
+# Decoded payloads kept per container; a session presents the same few tokens
+# on every request, so a small cache covers the warm working set
+TOKEN_PAYLOAD_CACHE_SIZE = 128
+
+
+def b64url_decode(segment):
+    """Decode a base64url segment, restoring stripped padding"""
+    padding = len(segment) % 4
+    if padding:
+        segment += '=' * (4 - padding)
+    return base64.urlsafe_b64decode(segment)
+
+
+def parse_cookies(event):
+    """
+    Parse every Cookie header of an API Gateway event into a dict
+
+    API Gateway may deliver cookies as 'Cookie' or 'cookie', in 'headers'
+    and/or 'multiValueHeaders'. All values are collected and split in a
+    single pass; the first occurrence of a name wins, matching browsers
+    which send the most specific cookie first.
+
+    Args:
+        event: API Gateway proxy event
+
+    Returns:
+        dict: Cookie name -> value
+    """
+    header_values = []
+    for name, values in (event.get('multiValueHeaders') or {}).items():
+        if name.lower() == 'cookie' and values:
+            header_values.extend(values)
+
+    if not header_values:
+        for name, value in (event.get('headers') or {}).items():
+            if name.lower() == 'cookie' and value:
+                header_values.append(value)
+
+    cookies = {}
+    for pair in ';'.join(header_values).split(';'):
+        name, separator, value = pair.partition('=')
+        name = name.strip()
+        if not separator or not name or name in cookies:
+            continue
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] == '"':
+            value = value[1:-1]
+        cookies[name] = value
+
+    return cookies
+
+
+@lru_cache(maxsize=TOKEN_PAYLOAD_CACHE_SIZE)
+def _decode_payload(token):
+    # JWT tokens have 3 parts separated by dots
+    parts = token.split('.')
+    if len(parts) != 3:
+        return None
+
+    try:
+        payload = json.loads(b64url_decode(parts[1]).decode('utf-8'))
+    except Exception:
+        return None
+
+    return payload if isinstance(payload, dict) else None
+
+
+def decode_token_payload(token):
+    """
+    Decode a JWT payload (second part) without verifying it
+
+    Results are cached per token string, so a warm container decodes a
+    given token once. Callers receive their own copy of the claims.
+
+    Returns:
+        dict or None: Token claims, or None if the token is malformed
+    """
+    if not token or not isinstance(token, str):
+        return None
+
+    payload = _decode_payload(token)
+    return dict(payload) if payload is not None else None
@@ -0,0 +1,106 @@
+import threading
+import time
+
+from structured_log import record_dependency
+
+# One client per service per container, built on first use. Importing boto3
+# (botocore's session and service models) is the largest part of a cold
+# start, so functions that never reach AWS on a code path never pay for it.
+_clients = {}
+_clients_lock = threading.Lock()
+
+_serializer = None
+_deserializer = None
+
+# Dependency dimension for each service's call latency metrics
+SERVICE_DEPENDENCIES = {
+    'cognito-idp': 'Cognito',
+    'dynamodb': 'DynamoDB',
+    'sqs': 'SQS'
+}
+
+
+def _instrument(service_name, client):
+    """
+    Time every API call made through a client, retries included
+
+    botocore hands the same context dict to before-call and to after-call
+    (or after-call-error when the request raises), so the start time rides
+    along with the call and concurrent calls never mix up.
+    """
+    dependency = SERVICE_DEPENDENCIES.get(service_name, service_name)
+
+    def before_call(context, **kwargs):
+        context['instrumentation_started'] = time.perf_counter()
+
+    def after_call(context, **kwargs):
+        started = context.pop('instrumentation_started', None)
+        if started is not None:
+            record_dependency(dependency, (time.perf_counter() - started) * 1000)
+
+    client.meta.events.register('before-call', before_call)
+    client.meta.events.register('after-call', after_call)
+    client.meta.events.register('after-call-error', after_call)
+    return client
+
+
+def get_client(service_name):
+    """Return the container-wide low-level client for a service, creating it on first use"""
+    client = _clients.get(service_name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(service_name)
+            if client is None:
+                import boto3
+                client = _instrument(service_name, boto3.client(service_name))
+                _clients[service_name] = client
+    return client
+
+
+def register_client(service_name, client):
+    """Use a prebuilt client for a service (tests, local runs, custom endpoints)"""
+    with _clients_lock:
+        _clients[service_name] = _instrument(service_name, client)
+
+
+def reset_clients():
+    """Drop all cached clients (tests)"""
+    with _clients_lock:
+        _clients.clear()
+
+
+class LazyClient:
+    """
+    Module-level stand-in for a boto3 client
+
+    Handlers keep the familiar `cognito_client.get_user(...)` call style while
+    the real client is only built the first time an attribute is used.
+    """
+
+    def __init__(self, service_name):
+        self.service_name = service_name
+
+    def __getattr__(self, name):
+        return getattr(get_client(self.service_name), name)
+
+
+def lazy_client(service_name):
+    return LazyClient(service_name)
+
+
+def serialize_item(values):
+    """Convert a dict of Python values to DynamoDB attribute values (low-level API)"""
+    global _serializer
+    if _serializer is None:
+        from boto3.dynamodb.types import TypeSerializer
+        _serializer = TypeSerializer()
+    return {name: _serializer.serialize(value) for name, value in values.items()}
+
+
+def deserialize_item(item):
+    """Convert DynamoDB attribute values back to Python values (numbers become Decimal)"""
+    global _deserializer
+    if _deserializer is None:
+        from boto3.dynamodb.types import TypeDeserializer
+        _deserializer = TypeDeserializer()
+    return {name: _deserializer.deserialize(value) for name, value in (item or {}).items()}
@@ -0,0 +1,77 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+# Worker threads are created on demand and reused across warm invocations.
+# boto3 clients are thread-safe, so independent AWS calls can share them.
+MAX_WORKERS = int(os.environ.get('CONCURRENCY_MAX_WORKERS', '8'))
+
+# Default per-call timeout in seconds, kept below the Lambda timeouts in lambda.tf
+DEFAULT_CALL_TIMEOUT_SECONDS = float(os.environ.get('CONCURRENCY_CALL_TIMEOUT_SECONDS', '5'))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class CallTimeoutError(Exception):
+    """Raised in place of a result when a concurrent call misses its deadline"""
+
+
+def get_executor():
+    """Return the container-wide thread pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='fanout')
+    return _executor
+
+
+def run_concurrently(calls, timeout=None):
+    """
+    Run independent calls at the same time and gather their outcomes
+
+    Each call gets its own deadline measured from submission. A call that
+    misses it is reported as a CallTimeoutError; its thread is not killed
+    and finishes in the background, so only fan out idempotent work. Calls
+    run in a copy of the caller's context, so context variables (the
+    invocation structured_log records into) carry over to the worker.
+
+    Args:
+        calls: dict of name -> zero-argument callable, or name -> (callable, timeout)
+        timeout: Default per-call timeout in seconds
+
+    Returns:
+        dict: name -> (result, error) where error is the raised exception or None
+
+    Example:
+        results = run_concurrently({
+            'user': lambda: cognito_client.get_user(AccessToken=token),
+            'record': lambda: get_user_record(user_id)
+        })
+        user, user_error = results['user']
+    """
+    default_timeout = DEFAULT_CALL_TIMEOUT_SECONDS if timeout is None else timeout
+    executor = get_executor()
+    started = time.monotonic()
+
+    futures = {}
+    for name, call in calls.items():
+        call_timeout = default_timeout
+        if isinstance(call, tuple):
+            call, call_timeout = call
+        futures[name] = (executor.submit(contextvars.copy_context().run, call), call_timeout)
+
+    results = {}
+    for name, (future, call_timeout) in futures.items():
+        remaining = max(0, call_timeout - (time.monotonic() - started))
+        try:
+            results[name] = (future.result(timeout=remaining), None)
+        except FutureTimeoutError:
+            results[name] = (None, CallTimeoutError(f"{name} did not complete within {call_timeout}s"))
+        except Exception as e:
+            results[name] = (None, e)
+
+    return results
@@ -0,0 +1,38 @@
+import hashlib
+import hmac
+import os
+
+# Shared by google_auth and the verify_auth_challenge trigger. Whoever holds
+# it can sign in as any user, so it only lives in Lambda environment variables.
+FEDERATED_AUTH_SECRET = os.environ.get('FEDERATED_AUTH_SECRET', '')
+
+# Marks the custom challenge issued for federated (Google) sign-ins
+FEDERATED_CHALLENGE = 'FEDERATED_PROOF'
+
+
+def sign_federated_challenge(email, nonce):
+    """
+    Answer a federated sign-in challenge
+
+    The answer is an HMAC over the user's email and the single-use nonce
+    issued by create_auth_challenge, so it cannot be replayed against
+    another session or another user.
+
+    Args:
+        email: Email of the Cognito user being signed in
+        nonce: Public nonce from the CUSTOM_CHALLENGE parameters
+
+    Returns:
+        str: Hex-encoded challenge answer
+    """
+    if not FEDERATED_AUTH_SECRET:
+        raise RuntimeError("FEDERATED_AUTH_SECRET is not configured")
+    message = f"{email.lower()}|{nonce}".encode('utf-8')
+    return hmac.new(FEDERATED_AUTH_SECRET.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+
+def verify_federated_answer(email, nonce, answer):
+    """Check a challenge answer produced by sign_federated_challenge"""
+    if not FEDERATED_AUTH_SECRET or not email or not nonce or not answer:
+        return False
+    return hmac.compare_digest(sign_federated_challenge(email, nonce), answer)
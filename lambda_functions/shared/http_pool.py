@@ -0,0 +1,245 @@
+import http.client
+import json
+import os
+import select
+import threading
+import time
+import urllib.parse
+
+from structured_log import record_dependency
+
+# Defaults for outbound HTTP calls, overridable per request
+DEFAULT_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('HTTP_CONNECT_TIMEOUT_SECONDS', '2'))
+DEFAULT_READ_TIMEOUT_SECONDS = float(os.environ.get('HTTP_READ_TIMEOUT_SECONDS', '5'))
+
+# Idle keep-alive connections kept per host between warm invocations
+MAX_IDLE_CONNECTIONS_PER_HOST = 4
+
+# Methods that may be replayed after the request has reached the server
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+# Dependency dimension for call latency metrics, by host (or parent domain)
+DEPENDENCY_HOSTS = {
+    'challenges.cloudflare.com': 'Turnstile',
+    'googleapis.com': 'Google',
+    'accounts.google.com': 'Google',
+    'amazonaws.com': 'Cognito'  # only the user pool JWKS is fetched outside boto3
+}
+
+# Errors raised when a reused keep-alive connection was closed by the server
+# while idle. Raised while sending, the request never reached the server
+# and can be resent. Raised while waiting for the response, the server may
+# have received and processed it, so only idempotent methods are resent.
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    ConnectionResetError,
+    BrokenPipeError
+)
+
+
+def _is_dropped(connection):
+    """
+    True if an idle connection's socket is readable, i.e. the server closed it
+
+    An idle keep-alive connection has nothing to read until the next
+    request, so readability means EOF (or a stray byte that would corrupt
+    the next response either way).
+    """
+    if connection.sock is None:
+        return True
+    try:
+        readable, _, _ = select.select([connection.sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(readable)
+
+
+class TransportError(Exception):
+    """Connection-level failure talking to a remote HTTP endpoint"""
+
+
+class HTTPResponse:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body.decode('utf-8'))
+
+
+class ConnectionPool:
+    """
+    Persistent keep-alive connections to one scheme://host:port
+
+    Pools live at module level, so warm invocations reuse open TCP/TLS
+    connections instead of paying a handshake on every call.
+    """
+
+    def __init__(self, scheme, host, port):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self, connect_timeout):
+        if self.scheme == 'https':
+            connection = http.client.HTTPSConnection(self.host, self.port, timeout=connect_timeout)
+        else:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=connect_timeout)
+        connection.connect()
+        return connection
+
+    def _acquire(self):
+        """Return an idle connection, discarding any the server has closed meanwhile"""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection = self._idle.pop()
+            if not _is_dropped(connection):
+                return connection
+            connection.close()
+
+    def _release(self, connection):
+        with self._lock:
+            if len(self._idle) < MAX_IDLE_CONNECTIONS_PER_HOST:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def warm(self, connect_timeout=None):
+        """Open a connection ahead of time (e.g. during Lambda init)"""
+        connection = self._connect(connect_timeout or DEFAULT_CONNECT_TIMEOUT_SECONDS)
+        self._release(connection)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def request(self, method, path, body=None, headers=None,
+                connect_timeout=None, read_timeout=None, retries=1):
+        """
+        Send a request over a pooled connection
+
+        Retries are limited to failures where replaying cannot duplicate
+        work: connection establishment errors, a reused connection that
+        failed before the request was fully sent, and any transport error
+        for idempotent methods. Once a POST has been sent it is never
+        resent, since the server may already have processed it (Turnstile
+        tokens and OAuth codes are single use).
+
+        Raises:
+            TransportError: the request could not be completed
+        """
+        connect_timeout = connect_timeout or DEFAULT_CONNECT_TIMEOUT_SECONDS
+        read_timeout = read_timeout or DEFAULT_READ_TIMEOUT_SECONDS
+        attempts_left = retries + 1
+        stale_retry_used = False
+
+        while True:
+            attempts_left -= 1
+            connection = self._acquire()
+            reused = connection is not None
+
+            if not reused:
+                try:
+                    connection = self._connect(connect_timeout)
+                except OSError as e:
+                    if attempts_left > 0:
+                        continue
+                    raise TransportError(f"Could not connect to {self.host}: {str(e)}") from e
+
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+            sent = False
+            try:
+                connection.sock.settimeout(read_timeout)
+                connection.request(method, path, body=body, headers=headers or {})
+                sent = True
+                response = connection.getresponse()
+                payload = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                stale = reused and isinstance(e, _STALE_CONNECTION_ERRORS) and not stale_retry_used
+                if stale and (not sent or idempotent):
+                    # Does not consume a retry: the idle connection had been closed
+                    stale_retry_used = True
+                    attempts_left += 1
+                    continue
+                if idempotent and attempts_left > 0:
+                    continue
+                raise TransportError(f"Request to {self.host} failed: {str(e)}") from e
+
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(connection)
+
+            return HTTPResponse(response.status, dict(response.getheaders()), payload)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def dependency_name(host):
+    """Map a host to its DEPENDENCY_HOSTS name, falling back to the host itself"""
+    for domain, name in DEPENDENCY_HOSTS.items():
+        if host == domain or host.endswith('.' + domain):
+            return name
+    return host
+
+
+def get_pool(url):
+    """Return the shared pool for the scheme/host/port of url"""
+    parts = urllib.parse.urlsplit(url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    key = (parts.scheme, parts.hostname, port)
+
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(parts.scheme, parts.hostname, port)
+    return pool
+
+
+def request(method, url, body=None, headers=None, **kwargs):
+    """
+    Send an HTTP request through the shared connection pools
+
+    The call's latency, retries included, is recorded against the host's
+    dependency name for the invocation's metrics.
+
+    Args:
+        method: HTTP method
+        url: Absolute http(s) URL
+        body: Request body bytes, optional
+        headers: Request headers, optional
+        **kwargs: connect_timeout, read_timeout, retries (see ConnectionPool.request)
+
+    Returns:
+        HTTPResponse
+    """
+    parts = urllib.parse.urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path = f"{path}?{parts.query}"
+
+    started = time.perf_counter()
+    try:
+        return get_pool(url).request(method, path, body=body, headers=headers, **kwargs)
+    finally:
+        record_dependency(dependency_name(parts.hostname), (time.perf_counter() - started) * 1000)
+
+
+def reset_pools():
+    """Close every pooled connection (tests, or after a fork)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
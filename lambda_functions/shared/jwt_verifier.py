@@ -0,0 +1,202 @@
+import hashlib
+import hmac
+import json
+import os
+import time
+
+from botocore.exceptions import ClientError
+
+from auth_tokens import b64url_decode
+from oidc_metadata import get_provider, get_endpoint, get_signing_key
+
+# Allowed clock drift between the token issuer and the Lambda host
+CLOCK_SKEW_SECONDS = 5
+
+# ASN.1 DigestInfo prefix for SHA-256 (RFC 8017, section 9.2)
+_SHA256_DIGEST_INFO = bytes.fromhex('3031300d060960864801650304020105000420')
+
+
+def _rsa_sha256_verify(public_key, message, signature):
+    """Verify an RSASSA-PKCS1-v1_5 SHA-256 signature (RS256)"""
+    modulus, exponent = public_key
+    key_length = (modulus.bit_length() + 7) // 8
+    if len(signature) != key_length:
+        return False
+
+    signature_int = int.from_bytes(signature, 'big')
+    if signature_int >= modulus:
+        return False
+
+    encoded = pow(signature_int, exponent, modulus).to_bytes(key_length, 'big')
+    digest_info = _SHA256_DIGEST_INFO + hashlib.sha256(message).digest()
+    padding_length = key_length - len(digest_info) - 3
+    if padding_length < 8:
+        return False
+
+    expected = b'\x00\x01' + b'\xff' * padding_length + b'\x00' + digest_info
+    return hmac.compare_digest(encoded, expected)
+
+
+def verify_jwt(token, jwks_url, issuer, audience=None, client_id=None, token_use=None):
+    """
+    Verify an RS256 JWT locally against a JWKS endpoint
+
+    Args:
+        token: Encoded JWT string
+        jwks_url: URL of the issuer's JWKS document
+        issuer: Expected 'iss' claim, or a tuple of accepted values
+        audience: Expected 'aud' claim (ID tokens), optional
+        client_id: Expected 'client_id' claim (Cognito access tokens), optional
+        token_use: Expected 'token_use' claim ('access' or 'id'), optional
+
+    Returns:
+        tuple: (claims: dict or None, error_message: str or None)
+    """
+    if not token:
+        return None, "Token is required"
+
+    try:
+        header_segment, payload_segment, signature_segment = token.split('.')
+        header = json.loads(b64url_decode(header_segment))
+        claims = json.loads(b64url_decode(payload_segment))
+        signature = b64url_decode(signature_segment)
+    except (ValueError, TypeError):
+        return None, "Malformed token"
+
+    if not isinstance(header, dict) or not isinstance(claims, dict):
+        return None, "Malformed token"
+
+    if header.get('alg') != 'RS256':
+        return None, "Unsupported token algorithm"
+
+    try:
+        public_key = get_signing_key(jwks_url, header.get('kid'))
+    except Exception as e:
+        return None, f"Unable to load signing keys: {str(e)}"
+
+    if not public_key:
+        return None, "Unknown signing key"
+
+    signing_input = f"{header_segment}.{payload_segment}".encode('ascii')
+    if not _rsa_sha256_verify(public_key, signing_input, signature):
+        return None, "Invalid token signature"
+
+    now = time.time()
+    if not isinstance(claims.get('exp'), (int, float)) or claims['exp'] + CLOCK_SKEW_SECONDS < now:
+        return None, "Token has expired"
+
+    issuers = issuer if isinstance(issuer, tuple) else (issuer,)
+    if claims.get('iss') not in issuers:
+        return None, "Invalid token issuer"
+
+    if token_use and claims.get('token_use') != token_use:
+        return None, "Invalid token use"
+
+    if client_id and claims.get('client_id') != client_id:
+        return None, "Invalid token client"
+
+    if audience:
+        aud = claims.get('aud')
+        audiences = aud if isinstance(aud, list) else [aud]
+        if audience not in audiences:
+            return None, "Invalid token audience"
+
+    return claims, None
+
+
+def cognito_issuer():
+    """Issuer URL of the configured Cognito user pool"""
+    user_pool_id = os.environ['COGNITO_USER_POOL_ID']
+    # Pool ids are prefixed with their region, e.g. ap-southeast-2_AbCdEf123
+    region = user_pool_id.split('_', 1)[0]
+    return f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}"
+
+
+def cognito_jwks_url():
+    """JWKS URL of the configured Cognito user pool"""
+    return f"{cognito_issuer()}/.well-known/jwks.json"
+
+
+def verify_cognito_token(token, token_use='access', strict=False, cognito_client=None):
+    """
+    Verify a Cognito user pool token without a network round trip
+
+    Signature, expiry, issuer, token_use and client are checked in-process
+    against the pool's cached JWKS. Strict mode additionally calls Cognito
+    GetUser so globally signed-out or deleted users are rejected; use it on
+    revocation-sensitive routes only, as it costs a round trip and GetUser quota.
+
+    Args:
+        token: Encoded Cognito JWT
+        token_use: 'access' or 'id'
+        strict: Also confirm the access token with Cognito
+        cognito_client: boto3 cognito-idp client, required when strict is True
+
+    Returns:
+        tuple: (claims: dict or None, error_message: str or None)
+    """
+    issuer = cognito_issuer()
+    client_id = os.environ['COGNITO_CLIENT_ID']
+
+    claims, error = verify_jwt(
+        token,
+        jwks_url=cognito_jwks_url(),
+        issuer=issuer,
+        audience=client_id if token_use == 'id' else None,
+        client_id=client_id if token_use == 'access' else None,
+        token_use=token_use
+    )
+    if error or not strict:
+        return claims, error
+
+    try:
+        cognito_client.get_user(AccessToken=token)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ['NotAuthorizedException', 'UserNotFoundException']:
+            return None, "Token has been revoked"
+        raise
+
+    return claims, None
+
+
+def verify_oidc_id_token(token, provider, client_id):
+    """
+    Verify an ID token from any provider configured in oidc_metadata
+
+    Args:
+        token: Encoded ID token
+        provider: Provider name, e.g. 'google'
+        client_id: Expected audience
+
+    Returns:
+        tuple: (claims: dict or None, error_message: str or None)
+    """
+    try:
+        jwks_url = get_endpoint(provider, 'jwks_uri')
+    except KeyError:
+        return None, f"Unknown identity provider: {provider}"
+
+    return verify_jwt(
+        token,
+        jwks_url=jwks_url,
+        issuer=tuple(get_provider(provider)['issuers']),
+        audience=client_id
+    )
+
+
+def verify_google_id_token(token, client_id=None):
+    """
+    Verify a Google OpenID Connect ID token locally
+
+    Checks the signature against Google's cached JWKS (refetched on key
+    rotation), expiry, issuer and that the token was issued to our OAuth
+    client, so identity claims can be trusted without calling userinfo.
+
+    Args:
+        token: Encoded Google ID token
+        client_id: Expected audience, defaults to GOOGLE_CLIENT_ID
+
+    Returns:
+        tuple: (claims: dict or None, error_message: str or None)
+    """
+    return verify_oidc_id_token(token, 'google', client_id or os.environ['GOOGLE_CLIENT_ID'])
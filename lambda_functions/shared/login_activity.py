@@ -0,0 +1,170 @@
+import base64
+import gzip
+import json
+import os
+from collections import deque
+
+from aws_clients import get_client
+from user_store import get_user_record, record_login, utc_now
+from concurrency import run_concurrently
+from structured_log import log_event
+
+# How login activity reaches the users table:
+#   sync  - write to DynamoDB before responding (default)
+#   sqs   - send a compact event to LOGIN_ACTIVITY_QUEUE_URL
+#   log   - print the event without email or name; a CloudWatch Logs
+#           subscription delivers it and the consumer looks the user up
+#   local - append to an in-process queue (tests and local runs)
+LOGIN_ACTIVITY_MODE = os.environ.get('LOGIN_ACTIVITY_MODE', 'sync').lower()
+
+# Marker key identifying login events among other log lines
+LOG_EVENT_KEY = 'loginActivity'
+
+# The only login event fields written to CloudWatch Logs in 'log' mode;
+# email and name stay out of the logs like everything structured_log redacts
+LOG_EVENT_FIELDS = ('userId', 'provider', 'updateProvider', 'at')
+
+local_queue = deque()
+
+def _sqs():
+    return get_client('sqs')
+
+
+def build_login_event(user_id, email, name='', provider='Email', update_provider=True):
+    """Compact login event, applied later with record_login"""
+    return {
+        'userId': user_id,
+        'email': email,
+        'name': name,
+        'provider': provider,
+        'updateProvider': update_provider,
+        'at': utc_now()
+    }
+
+
+def publish_login(user_id, email, name='', provider='Email', update_provider=True, mode=None):
+    """
+    Record a successful login according to LOGIN_ACTIVITY_MODE
+
+    In the asynchronous modes sign-in latency no longer depends on
+    DynamoDB; the login_activity_consumer Lambda applies the events.
+
+    Returns:
+        bool: True if the activity was written or handed off
+    """
+    mode = mode or LOGIN_ACTIVITY_MODE
+
+    if mode == 'sync':
+        return record_login(user_id, email, name=name, provider=provider, update_provider=update_provider)
+
+    if not user_id or not email:
+        log_event('Missing required user info', level='WARN', user_id=user_id, email=email)
+        return False
+
+    login_event = build_login_event(user_id, email, name, provider, update_provider)
+
+    try:
+        if mode == 'sqs':
+            _sqs().send_message(
+                QueueUrl=os.environ['LOGIN_ACTIVITY_QUEUE_URL'],
+                MessageBody=json.dumps(login_event, separators=(',', ':'))
+            )
+        elif mode == 'log':
+            logged_event = {field: login_event[field] for field in LOG_EVENT_FIELDS}
+            print(json.dumps({LOG_EVENT_KEY: logged_event}, separators=(',', ':')))
+        elif mode == 'local':
+            local_queue.append(login_event)
+        else:
+            log_event('Unknown LOGIN_ACTIVITY_MODE, writing synchronously', level='WARN', mode=mode)
+            return record_login(user_id, email, name=name, provider=provider, update_provider=update_provider)
+        return True
+
+    except Exception as e:
+        log_event('Error publishing login activity', level='ERROR', error=str(e))
+        return False
+
+
+def events_from_log_subscription(payload):
+    """Extract login events from a CloudWatch Logs subscription payload"""
+    data = json.loads(gzip.decompress(base64.b64decode(payload['awslogs']['data'])))
+    login_events = []
+    for line in data.get('logEvents', []):
+        message = line.get('message', '')
+        start = message.find('{')
+        if LOG_EVENT_KEY not in message or start < 0:
+            continue
+        try:
+            login_events.append(json.loads(message[start:])[LOG_EVENT_KEY])
+        except (ValueError, KeyError):
+            log_event('Skipping malformed login activity line', level='WARN', id=line.get('id'))
+    return login_events
+
+
+def lookup_identity(user_id):
+    """
+    Find the email and name for a login event that does not carry them
+
+    The users table answers for anyone who already has a record; a first
+    login (a new Google user) is looked up in Cognito by sub.
+
+    Returns:
+        tuple: (email or None, name)
+    """
+    record = get_user_record(user_id, fields=['email', 'name'])
+    if record and record.email:
+        return record.email, record.name or ''
+
+    users = get_client('cognito-idp').list_users(
+        UserPoolId=os.environ['COGNITO_USER_POOL_ID'],
+        Filter=f'sub = "{user_id}"',
+        Limit=1
+    ).get('Users', [])
+    if not users:
+        return None, ''
+    attributes = {attr['Name']: attr['Value'] for attr in users[0].get('Attributes', [])}
+    return attributes.get('email'), attributes.get('name', '')
+
+
+def apply_login_events(login_events):
+    """
+    Apply a batch of login events to the users table
+
+    Events are collapsed to the latest one per user, then written
+    concurrently, one conditional upsert per user. Events without a userId
+    or timestamp are skipped. Events from 'log' mode carry no email or
+    name; those are looked up first (lookup_identity).
+
+    Returns:
+        set: userIds whose write failed
+    """
+    latest = {}
+    for login_event in login_events:
+        user_id, at = login_event.get('userId'), login_event.get('at')
+        if user_id and at and (user_id not in latest or at > latest[user_id]['at']):
+            latest[user_id] = login_event
+
+    def apply(login_event):
+        def write():
+            email, name = login_event.get('email'), login_event.get('name', '')
+            if not email:
+                email, name = lookup_identity(login_event['userId'])
+            return record_login(
+                login_event['userId'],
+                email,
+                name=name,
+                provider=login_event.get('provider', 'Email'),
+                update_provider=login_event.get('updateProvider', True),
+                logged_in_at=login_event['at']
+            )
+        return write
+
+    results = run_concurrently({user_id: apply(e) for user_id, e in latest.items()})
+    return {user_id for user_id, (written, error) in results.items() if error or not written}
+
+
+def drain_local_queue():
+    """Apply everything queued in 'local' mode; returns userIds that failed"""
+    login_events = []
+    while local_queue:
+        login_events.append(local_queue.popleft())
+    return apply_login_events(login_events)
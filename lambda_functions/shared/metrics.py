@@ -0,0 +1,54 @@
+import json
+import os
+import time
+
+# CloudWatch namespace for custom application metrics
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'ServerlessAuth')
+
+
+def emit_metrics(metrics, dimensions=None, units=None, properties=None, dimension_sets=None):
+    """
+    Emit custom metrics as a CloudWatch Embedded Metric Format log line
+
+    Lambda forwards stdout to CloudWatch Logs, which extracts the metrics
+    asynchronously, so publishing costs no API call on the request path.
+
+    Args:
+        metrics: Metric name -> numeric value
+        dimensions: Dimension name -> value, optional
+        units: Metric name -> CloudWatch unit (default 'Count')
+        properties: Extra non-metric fields to include for log queries
+        dimension_sets: Lists of dimension names to aggregate by, optional
+            (default: all dimensions together). A metric value may be a
+            list of up to 100 values, each counted as one sample.
+    """
+    dimensions = dimensions or {}
+    units = units or {}
+
+    document = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': dimension_sets or [list(dimensions.keys())],
+                'Metrics': [
+                    {'Name': name, 'Unit': units.get(name, 'Count')}
+                    for name in metrics
+                ]
+            }]
+        }
+    }
+    document.update(properties or {})
+    document.update(dimensions)
+    document.update(metrics)
+
+    print(json.dumps(document))
+
+
+def record_cache_result(cache_name, cache, hit):
+    """Emit CacheHits/CacheMisses for one lookup in a named warm-container cache"""
+    emit_metrics(
+        {'CacheHits': 1 if hit else 0, 'CacheMisses': 0 if hit else 1},
+        dimensions={'Cache': cache_name},
+        properties={'cacheSize': len(cache)}
+    )
@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+import time
+
+import http_pool
+from auth_tokens import b64url_decode
+from concurrency import get_executor
+from structured_log import log_event
+
+# Discovery documents and JWKS are cached per container for this long. After
+# that the cached copy is still served while a background refresh runs.
+OIDC_METADATA_TTL_SECONDS = int(os.environ.get(
+    'OIDC_METADATA_TTL_SECONDS',
+    os.environ.get('JWKS_CACHE_TTL_SECONDS', '3600')
+))
+
+# Unknown kids force a synchronous refetch, but never more often than this
+# (protects against tokens with garbage kids forcing a fetch on every request)
+OIDC_MIN_REFRESH_SECONDS = 30
+
+# Built-in providers. Extra ones come from the OIDC_PROVIDERS environment
+# variable as JSON, e.g. {"okta": {"issuer": "https://example.okta.com"}}.
+# 'issuers' lists every accepted 'iss' value and 'defaults' supplies
+# endpoints to use when discovery is unreachable on a cold container.
+_BUILTIN_PROVIDERS = {
+    'google': {
+        'issuer': 'https://accounts.google.com',
+        'issuers': ['https://accounts.google.com', 'accounts.google.com'],
+        'defaults': {
+            'authorization_endpoint': 'https://accounts.google.com/o/oauth2/v2/auth',
+            'token_endpoint': 'https://oauth2.googleapis.com/token',
+            'userinfo_endpoint': 'https://openidconnect.googleapis.com/v1/userinfo',
+            'jwks_uri': 'https://www.googleapis.com/oauth2/v3/certs'
+        }
+    }
+}
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+# Discovery URL -> time of the last failed fetch, so an outage does not put
+# a blocking fetch on every request
+_discovery_failures = {}
+
+
+def _load_providers():
+    providers = {}
+    configured = dict(_BUILTIN_PROVIDERS)
+    configured.update(json.loads(os.environ.get('OIDC_PROVIDERS') or '{}'))
+    for name, provider in configured.items():
+        provider = dict(provider)
+        provider.setdefault('issuers', [provider['issuer']])
+        provider.setdefault('defaults', {})
+        provider.setdefault(
+            'discovery_url',
+            provider['issuer'].rstrip('/') + '/.well-known/openid-configuration'
+        )
+        providers[name] = provider
+    return providers
+
+
+PROVIDERS = _load_providers()
+
+
+def get_provider(name):
+    """
+    Return the configuration for an OIDC provider
+
+    Raises:
+        KeyError: the provider is not configured
+    """
+    return PROVIDERS[name]
+
+
+def _fetch_json(url):
+    response = http_pool.request('GET', url)
+    if response.status != 200:
+        raise http_pool.TransportError(f"Request to {url} failed with status {response.status}")
+    return response.json()
+
+
+def _load_jwks(url):
+    """Download a JWKS document and index its RSA signing keys by kid"""
+    keys = {}
+    for jwk in _fetch_json(url).get('keys', []):
+        if jwk.get('kty') != 'RSA' or jwk.get('use', 'sig') != 'sig':
+            continue
+        keys[jwk['kid']] = (
+            int.from_bytes(b64url_decode(jwk['n']), 'big'),
+            int.from_bytes(b64url_decode(jwk['e']), 'big')
+        )
+    return keys
+
+
+def _store(url, loader):
+    value = loader(url)
+    with _cache_lock:
+        _cache[url] = {'value': value, 'fetched_at': time.time(), 'refreshing': False}
+    return value
+
+
+def _refresh_in_background(url, loader):
+    """Refresh an expired entry off the request path; keep serving it if that fails"""
+    def refresh():
+        try:
+            _store(url, loader)
+        except Exception as e:
+            log_event('Keeping stale OIDC metadata', level='WARN', url=url, error=str(e))
+            with _cache_lock:
+                if url in _cache:
+                    _cache[url]['refreshing'] = False
+
+    with _cache_lock:
+        entry = _cache.get(url)
+        if not entry or entry['refreshing']:
+            return
+        entry['refreshing'] = True
+    get_executor().submit(refresh)
+
+
+def _cached(url, loader, force_refresh=False):
+    """
+    Return a cached document, loading it on first use
+
+    Within the TTL the cached copy is returned as is. After it the stale
+    copy is returned immediately and refreshed in the background, so only
+    the first request in a container waits on the network. force_refresh
+    refetches synchronously (throttled by OIDC_MIN_REFRESH_SECONDS) and
+    falls back to the stale copy if the fetch fails.
+    """
+    entry = _cache.get(url)
+    if entry is None:
+        return _store(url, loader)
+
+    age = time.time() - entry['fetched_at']
+    if force_refresh and age >= OIDC_MIN_REFRESH_SECONDS:
+        try:
+            return _store(url, loader)
+        except Exception as e:
+            log_event('OIDC metadata refresh failed, using cached copy', level='WARN', url=url, error=str(e))
+            return entry['value']
+
+    if age >= OIDC_METADATA_TTL_SECONDS:
+        _refresh_in_background(url, loader)
+    return entry['value']
+
+
+def get_discovery_document(name):
+    """Return the provider's OpenID discovery document, or {} if unreachable"""
+    url = get_provider(name)['discovery_url']
+    if url not in _cache and time.time() - _discovery_failures.get(url, 0) < OIDC_MIN_REFRESH_SECONDS:
+        return {}
+
+    try:
+        return _cached(url, _fetch_json)
+    except Exception as e:
+        _discovery_failures[url] = time.time()
+        log_event('OIDC discovery unavailable, using defaults', level='WARN', provider=name, error=str(e))
+        return {}
+
+
+def get_endpoint(name, key):
+    """
+    Look up a provider endpoint such as 'token_endpoint' or 'jwks_uri'
+
+    Prefers the discovery document and falls back to the provider's
+    configured defaults.
+    """
+    return get_discovery_document(name).get(key) or get_provider(name)['defaults'].get(key)
+
+
+def get_signing_key(jwks_url, kid):
+    """
+    Return the (modulus, exponent) pair for a kid from a cached JWKS
+
+    A kid missing from the cached set triggers an immediate refetch to pick
+    up rotated keys.
+    """
+    keys = _cached(jwks_url, _load_jwks)
+    if kid not in keys:
+        keys = _cached(jwks_url, _load_jwks, force_refresh=True)
+    return keys.get(kid)
+
+
+def prefetch_jwks(jwks_url):
+    """Load a JWKS into the container cache (init-time warmup)"""
+    _cached(jwks_url, _load_jwks)
+
+
+def clear_cache():
+    """Drop all cached metadata (tests)"""
+    with _cache_lock:
+        _cache.clear()
+        _discovery_failures.clear()
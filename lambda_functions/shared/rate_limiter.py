@@ -0,0 +1,275 @@
+import hashlib
+import os
+import time
+from calendar import timegm
+
+from botocore.exceptions import ClientError
+
+from aws_clients import get_client, serialize_item, deserialize_item
+from ttl_cache import TTLCache
+from concurrency import run_concurrently
+from structured_log import log_event
+
+# Counters live in their own table (see dynamodb.tf), partitioned by the
+# hashed subject with scope as sort key, and expired by DynamoDB TTL on expiresAt
+RATE_LIMIT_TABLE = os.environ.get('RATE_LIMIT_TABLE')
+
+# The limiter sits in front of every sign in; a slow DynamoDB write fails
+# open after this long instead of adding to the request's latency
+RATE_LIMIT_TIMEOUT_SECONDS = float(os.environ.get('RATE_LIMIT_TIMEOUT_SECONDS', '0.3'))
+
+# Deadline for a container's first limiter call, which also opens the TLS
+# connection to DynamoDB. With the short deadline every new container
+# would let its first request through unthrottled, and a burst that scales
+# Lambda out would bypass the limiter systematically.
+RATE_LIMIT_FIRST_CALL_TIMEOUT_SECONDS = float(os.environ.get('RATE_LIMIT_FIRST_CALL_TIMEOUT_SECONDS', '2'))
+_connected = False
+
+
+# Subjects already over a limit are rejected from memory until their window
+# clears, so a hot offender costs no DynamoDB writes in a warm container
+blocked_subjects = TTLCache(max_entries=1024)
+
+
+def _key(scope, subject):
+    """
+    Table key for one counter: hashed subject (partition key) and scope (sort key)
+
+    Subjects (emails, IPs) are stored hashed; the table holds no raw PII.
+    """
+    return {
+        'subject': hashlib.sha256(str(subject).strip().lower().encode('utf-8')).hexdigest(),
+        'scope': scope
+    }
+
+
+def _update(key, **params):
+    return get_client('dynamodb').update_item(
+        TableName=RATE_LIMIT_TABLE,
+        Key=serialize_item(key),
+        **params
+    )
+
+
+def _seconds_until_tomorrow(now):
+    tomorrow = time.gmtime(now + 86400)
+    midnight = timegm((tomorrow.tm_year, tomorrow.tm_mon, tomorrow.tm_mday, 0, 0, 0))
+    return max(1, midnight - now)
+
+
+def _old_item(error):
+    """Item returned with a ConditionalCheckFailed error"""
+    return deserialize_item(error.response.get('Item'))
+
+
+def _rejection(old_item, cooldown_seconds, daily_limit, now, today):
+    """Work out why a conditional write failed from the item it hit"""
+    last = int(old_item.get('lastAt', 0))
+    if last and now - last < cooldown_seconds:
+        return False, last + cooldown_seconds - now, 'cooldown'
+    if old_item.get('day') == today and int(old_item.get('dayCount', 0)) >= daily_limit:
+        return False, _seconds_until_tomorrow(now), 'daily_limit'
+    return None
+
+
+def acquire_cooldown_slot(scope, subject, cooldown_seconds, daily_limit, now=None):
+    """
+    Atomically enforce a cooldown and a per-day cap for one subject
+
+    The check and the increment happen in a single conditional UpdateItem,
+    so concurrent requests cannot all pass. When the condition fails the
+    item is returned with the error (ReturnValuesOnConditionCheckFailure),
+    which gives the remaining wait without another read.
+
+    The daily counter lives with the date it counts for. The first request
+    of a new UTC day fails the same-day condition and takes a second
+    conditional write that resets the counter; every other request costs a
+    single write. Items expire once both the day and the cooldown are over.
+
+    Args:
+        scope: What is being limited, e.g. 'resend_verification'
+        subject: Who is being limited, e.g. an email address
+        cooldown_seconds: Minimum seconds between two accepted requests
+        daily_limit: Maximum accepted requests per UTC day
+        now: Current epoch seconds, defaults to time.time()
+
+    Returns:
+        tuple: (allowed: bool, retry_after_seconds: int, reason: str or None)
+               reason is 'cooldown' or 'daily_limit' when rejected
+    """
+    key = _key(scope, subject)
+    now = int(now if now is not None else time.time())
+    today = time.strftime('%Y-%m-%d', time.gmtime(now))
+    expires_at = max(now + cooldown_seconds, now + _seconds_until_tomorrow(now))
+
+    names = {'#last': 'lastAt', '#count': 'dayCount', '#day': 'day', '#expires': 'expiresAt'}
+    cooldown_condition = '(attribute_not_exists(#last) OR #last <= :cutoff)'
+
+    writes = [
+        # Same day: bump the counter while below the cap
+        {
+            'UpdateExpression': 'SET #last = :now, #expires = :expires ADD #count :one',
+            'ConditionExpression': f'#day = :today AND #count < :limit AND {cooldown_condition}',
+            'ExpressionAttributeValues': serialize_item({
+                ':now': now, ':one': 1, ':today': today, ':expires': expires_at,
+                ':limit': daily_limit, ':cutoff': now - cooldown_seconds
+            })
+        },
+        # New day (or first request ever): start the counter over
+        {
+            'UpdateExpression': 'SET #last = :now, #count = :one, #day = :today, #expires = :expires',
+            'ConditionExpression': f'(attribute_not_exists(#day) OR #day <> :today) AND {cooldown_condition}',
+            'ExpressionAttributeValues': serialize_item({
+                ':now': now, ':one': 1, ':today': today, ':expires': expires_at,
+                ':cutoff': now - cooldown_seconds
+            })
+        }
+    ]
+
+    for write in writes:
+        try:
+            _update(
+                key,
+                ExpressionAttributeNames=names,
+                ReturnValuesOnConditionCheckFailure='ALL_OLD',
+                **write
+            )
+            return True, 0, None
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            rejection = _rejection(_old_item(e), cooldown_seconds, daily_limit, now, today)
+            if rejection:
+                return rejection
+
+    # Lost a race with a concurrent request that just reset the day
+    return False, cooldown_seconds, 'cooldown'
+
+
+def hit_sliding_window(scope, subject, limit, window_seconds, now=None, count_rejected=True):
+    """
+    Count one request against a sliding-window limit
+
+    Counts are kept per fixed window in attributes named w<index>. One
+    UpdateItem increments the current window, drops the one before the
+    previous and returns both live windows (ReturnValues=ALL_NEW). The rate
+    is then estimated as previous * (unelapsed share of the window) +
+    current, the usual sliding-window approximation. By default rejected
+    requests are counted too, so hammering a limit keeps it closed. Limits
+    on a victim-controlled subject (an email anyone can type) pass
+    count_rejected=False instead: the rejected hit is taken back, so a third
+    party cannot keep the limit closed indefinitely.
+
+    Args:
+        scope: What is being limited, e.g. 'signin_ip'
+        subject: Who is being limited, e.g. a source IP
+        limit: Maximum requests per window_seconds
+        window_seconds: Length of the sliding window
+        now: Current epoch seconds, defaults to time.time()
+        count_rejected: Keep a rejected request in the count
+
+    Returns:
+        tuple: (allowed: bool, retry_after_seconds: int)
+    """
+    key = _key(scope, subject)
+    now = now if now is not None else time.time()
+
+    cache_key = (scope, key['subject'])
+    blocked_until = blocked_subjects.get(cache_key)
+    if blocked_until:
+        return False, max(1, int(blocked_until - now))
+
+    window = int(now // window_seconds)
+    elapsed_share = (now % window_seconds) / window_seconds
+
+    response = _update(
+        key,
+        UpdateExpression='ADD #current :one SET #expires = :expires REMOVE #stale',
+        ExpressionAttributeNames={
+            '#current': f"w{window}",
+            '#stale': f"w{window - 2}",
+            '#expires': 'expiresAt'
+        },
+        ExpressionAttributeValues=serialize_item({
+            ':one': 1,
+            ':expires': (window + 2) * window_seconds
+        }),
+        ReturnValues='ALL_NEW'
+    )
+    item = deserialize_item(response.get('Attributes'))
+    current = int(item.get(f"w{window}", 0))
+    previous = int(item.get(f"w{window - 1}", 0))
+
+    if previous * (1 - elapsed_share) + current <= limit:
+        return True, 0
+
+    if not count_rejected:
+        _update(
+            key,
+            UpdateExpression='ADD #current :minus_one',
+            ExpressionAttributeNames={'#current': f"w{window}"},
+            ExpressionAttributeValues=serialize_item({':minus_one': -1})
+        )
+        current -= 1
+
+    # Stay closed at least until the current window ends; sooner if the
+    # previous window alone caused the overflow and decays within it
+    window_end = (window + 1) * window_seconds
+    if current <= limit and previous:
+        excess = previous * (1 - elapsed_share) + current - limit
+        retry_after = min(window_end - now, excess / previous * window_seconds)
+    else:
+        retry_after = window_end - now
+    retry_after = max(1, int(retry_after + 0.999))
+
+    blocked_subjects.set(cache_key, now + retry_after, now + retry_after)
+    return False, retry_after
+
+
+def throttle(limits, now=None, timeout=RATE_LIMIT_TIMEOUT_SECONDS):
+    """
+    Check several sliding-window limits at once (e.g. per IP and per email)
+
+    Limits with an empty subject are skipped. The DynamoDB writes run
+    concurrently. If the limiter itself is unavailable or slower than
+    timeout the request is let through: Cognito and API Gateway throttling
+    still apply behind it. The DynamoDB client is built before the deadline
+    starts, and a container's first call gets
+    RATE_LIMIT_FIRST_CALL_TIMEOUT_SECONDS to open its connection.
+
+    Args:
+        limits: list of (scope, subject, limit, window_seconds), optionally
+            with a fifth count_rejected flag (see hit_sliding_window)
+        now: Current epoch seconds, defaults to time.time()
+        timeout: Seconds to wait for the DynamoDB writes before failing open
+
+    Returns:
+        tuple: (allowed: bool, retry_after_seconds: int)
+    """
+    global _connected
+
+    def hit(scope, subject, limit, window_seconds, count_rejected=True):
+        return lambda: hit_sliding_window(
+            scope, subject, limit, window_seconds, now=now, count_rejected=count_rejected
+        )
+
+    calls = {spec[0]: hit(*spec) for spec in limits if spec[1]}
+    if not calls:
+        return True, 0
+
+    # Importing boto3 and building the client is local work, not limiter latency
+    get_client('dynamodb')
+    if not _connected:
+        timeout = max(timeout, RATE_LIMIT_FIRST_CALL_TIMEOUT_SECONDS)
+
+    retry_after = 0
+    for scope, (result, error) in run_concurrently(calls, timeout=timeout).items():
+        if error:
+            log_event('Rate limiter unavailable, allowing request', level='WARN', scope=scope, error=str(error))
+            continue
+        _connected = True
+        allowed, wait = result
+        if not allowed:
+            retry_after = max(retry_after, wait)
+
+    return retry_after == 0, retry_after
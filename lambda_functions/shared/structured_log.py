@@ -0,0 +1,212 @@
+import contextvars
+import functools
+import json
+import os
+import random
+import re
+import threading
+import time
+
+from metrics import emit_metrics
+
+# Share of successful invocations whose log line is written. Failures,
+# client errors and invocations that logged a warning are always written.
+LOG_SUCCESS_SAMPLE_RATE = min(1.0, max(0.0, float(os.environ.get('LOG_SUCCESS_SAMPLE_RATE', '1'))))
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARN': 30, 'ERROR': 40}
+
+# Values under these keys never reach the logs (compared lowercase, without '_')
+SENSITIVE_KEYS = {
+    'password', 'newpassword', 'temporarypassword', 'code', 'answer', 'secret',
+    'token', 'accesstoken', 'idtoken', 'refreshtoken', 'turnstiletoken',
+    'authorization', 'cookie', 'cookies', 'setcookie'
+}
+
+_EMAIL = re.compile(r'([A-Za-z0-9._%+-])[A-Za-z0-9._%+-]*@([A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+)')
+_JWT = re.compile(r'eyJ[\w-]+\.[\w-]+\.[\w-]*')
+
+# The invocation being logged, carried in a context variable: run_concurrently
+# copies the caller's context into its worker threads, so they log into the
+# same record, while threads started elsewhere (background refreshes) do not.
+# A worker that outlives its invocation finds it finished and writes its
+# entries as a line of their own instead of into a later invocation's record.
+_invocation = contextvars.ContextVar('invocation', default=None)
+_invocation_lock = threading.Lock()
+
+# Set by Lambda: 'on-demand', 'provisioned-concurrency' or 'snap-start'.
+# Only an on-demand container's first invocation waited for init.
+INITIALIZATION_TYPE = os.environ.get('AWS_LAMBDA_INITIALIZATION_TYPE', 'on-demand')
+_cold_start = INITIALIZATION_TYPE == 'on-demand'
+
+# EMF accepts at most 100 values per metric in one document
+MAX_METRIC_VALUES = 100
+
+
+def redact(value, key=None):
+    """
+    Mask PII and secrets in a log value
+
+    Sensitive keys are replaced outright, emails keep their first character
+    and domain (j***@example.com), JWTs are dropped.
+    """
+    if key is not None and str(key).lower().replace('_', '').replace('-', '') in SENSITIVE_KEYS:
+        return '[REDACTED]'
+    if isinstance(value, str):
+        value = _JWT.sub('[JWT]', value)
+        return _EMAIL.sub(lambda match: f"{match.group(1)}***@{match.group(2)}", value)
+    if isinstance(value, dict):
+        return {k: redact(v, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    return value
+
+
+def _write(document):
+    print(json.dumps(document, default=str, separators=(',', ':')))
+
+
+def log_event(message, level='INFO', **fields):
+    """
+    Log a message with structured fields
+
+    Inside a handler wrapped by logged_handler the entry is attached to that
+    invocation's single log line; elsewhere (container init, or a worker
+    thread still running after its invocation returned) it is written as its
+    own line. Messages and fields are redacted.
+
+    Example:
+        log_event('Rate limiter unavailable', level='WARN', scope=scope, error=str(e))
+    """
+    entry = redact(dict(fields, level=level, message=message))
+    invocation = _invocation.get()
+    if invocation is not None:
+        entry['atMs'] = round((time.perf_counter() - invocation['started']) * 1000, 1)
+        with _invocation_lock:
+            if not invocation['finished']:
+                invocation['events'].append(entry)
+                if LEVELS.get(level, 20) > LEVELS[invocation['level']]:
+                    invocation['level'] = level
+                return
+        entry['requestId'] = invocation['request_id']
+
+    _write(dict(entry, timestamp=int(time.time() * 1000)))
+
+
+def record_dependency(dependency, milliseconds):
+    """
+    Record one downstream call (Cognito, DynamoDB, Turnstile, Google, ...)
+
+    Called by the AWS client and HTTP pool instrumentation. The latency is
+    added to the invocation's timings and published as a DependencyLatency
+    metric when the invocation finishes.
+    """
+    invocation = _invocation.get()
+    if invocation is None:
+        return
+    with _invocation_lock:
+        if invocation['finished']:
+            return
+        invocation['dependencies'].setdefault(dependency, []).append(round(milliseconds, 1))
+        timings = invocation['timings']
+        timings[dependency] = round(timings.get(dependency, 0) + milliseconds, 1)
+
+
+def _outcome(response):
+    """(outcome, status code, error message from an API Gateway response body)"""
+    status = response.get('statusCode') if isinstance(response, dict) else None
+    if status is None or status < 400:
+        return 'success', status, None
+
+    try:
+        error = json.loads(response.get('body') or '{}').get('error')
+    except (ValueError, TypeError, AttributeError):
+        error = None
+    return ('client_error' if status < 500 else 'error'), status, error
+
+
+def _emit_invocation_metrics(handler_name, invocation):
+    """ColdStart per handler and DependencyLatency per handler and dependency, as EMF"""
+    emit_metrics(
+        {'ColdStart': 1 if invocation['cold_start'] else 0},
+        dimensions={'Handler': handler_name},
+        properties={'initializationType': INITIALIZATION_TYPE}
+    )
+    for dependency, latencies in invocation['dependencies'].items():
+        emit_metrics(
+            {'DependencyLatency': latencies[:MAX_METRIC_VALUES]},
+            dimensions={'Handler': handler_name, 'Dependency': dependency},
+            units={'DependencyLatency': 'Milliseconds'},
+            dimension_sets=[['Handler', 'Dependency'], ['Dependency']]
+        )
+
+
+def _finish(handler_name, context, invocation, outcome, status, error=None):
+    level = 'ERROR' if outcome == 'error' else invocation['level']
+
+    sample_rate = 1.0
+    if outcome == 'success' and LEVELS[level] < LEVELS['WARN']:
+        sample_rate = LOG_SUCCESS_SAMPLE_RATE
+        if random.random() >= sample_rate:
+            return
+
+    document = {
+        'level': level,
+        'handler': handler_name,
+        'requestId': invocation['request_id'],
+        'outcome': outcome,
+        'statusCode': status,
+        'durationMs': round((time.perf_counter() - invocation['started']) * 1000, 1),
+        'timings': invocation['timings'],
+        'sampleRate': sample_rate,
+        'coldStart': invocation['cold_start'],
+        'timestamp': int(time.time() * 1000)
+    }
+    if error:
+        document['error'] = redact(error)
+    if invocation['events']:
+        document['events'] = invocation['events']
+    _write(document)
+
+
+def logged_handler(handler_name):
+    """
+    Decorate a lambda_handler to log and instrument every invocation
+
+    Writes one structured JSON line carrying the request id, outcome
+    (success, client_error for 4xx, error for 5xx and exceptions), status
+    code, total duration, cold start flag, the per-dependency timings and
+    any events logged during the invocation. Successful invocations are
+    sampled at LOG_SUCCESS_SAMPLE_RATE; sampleRate is included so counts
+    can be scaled back up (sum(1 / sampleRate)).
+
+    Metrics are never sampled: every invocation emits ColdStart and the
+    latency of each downstream call recorded through record_dependency.
+    """
+    def decorate(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            global _cold_start
+            invocation = {
+                'started': time.perf_counter(), 'events': [], 'timings': {}, 'dependencies': {},
+                'level': 'INFO', 'cold_start': _cold_start, 'finished': False,
+                'request_id': getattr(context, 'aws_request_id', None)
+            }
+            _cold_start = False
+            token = _invocation.set(invocation)
+            try:
+                response = handler(event, context)
+            except Exception as e:
+                log_event('Unhandled exception', level='ERROR', error=type(e).__name__, detail=str(e))
+                _emit_invocation_metrics(handler_name, invocation)
+                _finish(handler_name, context, invocation, 'error', None)
+                raise
+            finally:
+                with _invocation_lock:
+                    invocation['finished'] = True
+                _invocation.reset(token)
+
+            _emit_invocation_metrics(handler_name, invocation)
+            _finish(handler_name, context, invocation, *_outcome(response))
+            return response
+        return wrapper
+    return decorate
@@ -0,0 +1,72 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+def hashed_key(*parts):
+    """Hash key parts (tokens, IPs, emails) so raw values are never held as cache keys"""
+    return hashlib.sha256('|'.join(str(part or '') for part in parts).encode('utf-8')).hexdigest()
+
+
+class TTLCache:
+    """
+    Bounded in-memory LRU cache with a per-entry expiry time
+
+    Lives at module level so entries survive warm invocations of the same
+    container. Each container has its own copy; nothing is shared between
+    concurrent executions, so only cache data that is safe to serve stale
+    for the lifetime of an entry.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, expires_at):
+        """Store value until the absolute epoch time expires_at"""
+        if expires_at <= time.time():
+            return
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        """Remove and return the value for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or entry[1] <= time.time():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,15 +1,41 @@
 import json
-import urllib.request
+import time
 import urllib.parse
 import os
 
-def verify_turnstile(token, remote_ip=None):
+import http_pool
+from ttl_cache import TTLCache, hashed_key
+from metrics import record_cache_result
+
+# Overridable so tests can point verification at a local stub server
+TURNSTILE_VERIFY_URL = os.environ.get(
+    'TURNSTILE_VERIFY_URL',
+    'https://challenges.cloudflare.com/turnstile/v0/siteverify'
+)
+TURNSTILE_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('TURNSTILE_CONNECT_TIMEOUT_SECONDS', '2'))
+TURNSTILE_READ_TIMEOUT_SECONDS = float(os.environ.get('TURNSTILE_READ_TIMEOUT_SECONDS', '5'))
+
+# Successful verifications are remembered per container so a client retrying
+# after a transient error is not rejected by Cloudflare as a duplicate token.
+# An entry is consumed by the first retry, so one solved challenge never
+# covers more than one extra attempt. Tokens are valid for 300 seconds at most.
+TURNSTILE_CACHE_TTL_SECONDS = min(int(os.environ.get('TURNSTILE_CACHE_TTL_SECONDS', '30')), 300)
+turnstile_cache = TTLCache(max_entries=512)
+
+def verify_turnstile(token, remote_ip=None, subject=None):
     """
     Verify Cloudflare Turnstile token
     
+    Uses a pooled keep-alive HTTPS connection, so warm containers skip the
+    TCP+TLS handshake to Cloudflare. A token that already verified for the
+    same client IP and subject within TURNSTILE_CACHE_TTL_SECONDS is
+    accepted once more without a network call; failures are never cached.
+    
     Args:
         token: The Turnstile token from the client
         remote_ip: Optional client IP address for additional validation
+        subject: What the token is spent on (the submitted email), so a
+            cached verification cannot be replayed for another account
         
     Returns:
         tuple: (success: bool, error_message: str or None)
@@ -21,9 +47,15 @@ def verify_turnstile(token, remote_ip=None):
     if not secret_key:
         return False, "Turnstile secret key not configured"
     
-    # Prepare the verification request
-    verify_url = "https://challenges.cloudflare.com/turnstile/v0/siteverify"
+    key = None
+    if TURNSTILE_CACHE_TTL_SECONDS > 0:
+        key = hashed_key(token, remote_ip, subject)
+        cached = turnstile_cache.pop(key)
+        record_cache_result('turnstile', turnstile_cache, cached is not None)
+        if cached:
+            return True, None
     
+    # Prepare the verification request
     data = {
         'secret': secret_key,
         'response': token
@@ -34,15 +66,20 @@ def verify_turnstile(token, remote_ip=None):
     
     try:
         # Make the verification request
-        req_data = urllib.parse.urlencode(data).encode('utf-8')
-        req = urllib.request.Request(verify_url, data=req_data, method='POST')
-        req.add_header('Content-Type', 'application/x-www-form-urlencoded')
-        
-        with urllib.request.urlopen(req, timeout=10) as response:
-            result = json.loads(response.read().decode('utf-8'))
+        response = http_pool.request(
+            'POST',
+            TURNSTILE_VERIFY_URL,
+            body=urllib.parse.urlencode(data).encode('utf-8'),
+            headers={'Content-Type': 'application/x-www-form-urlencoded'},
+            connect_timeout=TURNSTILE_CONNECT_TIMEOUT_SECONDS,
+            read_timeout=TURNSTILE_READ_TIMEOUT_SECONDS
+        )
+        result = response.json()
         
         # Check verification result
         if result.get('success'):
+            if key:
+                turnstile_cache.set(key, True, time.time() + TURNSTILE_CACHE_TTL_SECONDS)
             return True, None
         else:
             # Extract error codes if available
@@ -53,7 +90,7 @@ def verify_turnstile(token, remote_ip=None):
                 error_message = "Turnstile verification failed"
             return False, error_message
             
-    except urllib.error.URLError as e:
+    except http_pool.TransportError as e:
         return False, f"Network error during Turnstile verification: {str(e)}"
     except json.JSONDecodeError as e:
         return False, f"Invalid response from Turnstile API: {str(e)}"
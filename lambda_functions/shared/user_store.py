@@ -0,0 +1,238 @@
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+from aws_clients import get_client, serialize_item, deserialize_item
+from structured_log import log_event
+
+# Eventually consistent reads cost half and are served by any replica;
+# set USERS_TABLE_CONSISTENT_READ=true where read-after-write matters
+CONSISTENT_READ = os.environ.get('USERS_TABLE_CONSISTENT_READ', 'false').lower() == 'true'
+
+
+@dataclass
+class UserRecord:
+    """
+    A row of the users table (see dynamodb.tf)
+
+    Attribute names in DynamoDB are camelCase; ATTRIBUTE_NAMES maps each
+    field to its stored name. Fields not fetched by a projection are None.
+    """
+    user_id: str = None
+    email: str = None
+    name: str = None
+    verified: bool = None
+    provider: str = None
+    status: str = None
+    created_at: str = None
+    updated_at: str = None
+    last_login: str = None
+
+    ATTRIBUTE_NAMES = {
+        'user_id': 'userId',
+        'email': 'email',
+        'name': 'name',
+        'verified': 'verified',
+        'provider': 'provider',
+        'status': 'status',
+        'created_at': 'createdAt',
+        'updated_at': 'updatedAt',
+        'last_login': 'lastLogin'
+    }
+
+    @classmethod
+    def from_item(cls, item):
+        return cls(**{
+            field: item.get(attribute)
+            for field, attribute in cls.ATTRIBUTE_NAMES.items()
+        })
+
+    def to_item(self):
+        return {
+            attribute: getattr(self, field)
+            for field, attribute in self.ATTRIBUTE_NAMES.items()
+            if getattr(self, field) is not None
+        }
+
+
+def _table_name():
+    return os.environ['USERS_TABLE']
+
+
+def _projection(fields):
+    """Build ProjectionExpression arguments for the given UserRecord fields"""
+    names = {f"#{field}": UserRecord.ATTRIBUTE_NAMES[field] for field in fields}
+    return {
+        'ProjectionExpression': ', '.join(names),
+        'ExpressionAttributeNames': names
+    }
+
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def get_user_record(user_id, fields=None, consistent_read=None):
+    """
+    Fetch a user record by primary key
+
+    Args:
+        user_id: Cognito sub (the table's userId hash key)
+        fields: UserRecord field names to fetch; None fetches the whole item
+        consistent_read: Override USERS_TABLE_CONSISTENT_READ for this read
+
+    Returns:
+        UserRecord or None if the user has no record
+    """
+    params = {
+        'TableName': _table_name(),
+        'Key': serialize_item({'userId': user_id}),
+        'ConsistentRead': CONSISTENT_READ if consistent_read is None else consistent_read
+    }
+    if fields:
+        params.update(_projection(fields))
+
+    item = get_client('dynamodb').get_item(**params).get('Item')
+    return UserRecord.from_item(deserialize_item(item)) if item else None
+
+
+def find_user_by_email(email, fields=None):
+    """
+    Look up a user record through the EmailIndex GSI
+
+    GSI reads are always eventually consistent.
+
+    Returns:
+        UserRecord or None if no record has this email
+    """
+    params = {
+        'TableName': _table_name(),
+        'IndexName': 'EmailIndex',
+        'KeyConditionExpression': '#email = :email',
+        'ExpressionAttributeValues': serialize_item({':email': email}),
+        'ExpressionAttributeNames': {'#email': 'email'}
+    }
+    if fields:
+        # The hash key is always needed to address the record afterwards
+        projection = _projection(set(fields) | {'user_id', 'email'})
+        params['ProjectionExpression'] = projection['ProjectionExpression']
+        params['ExpressionAttributeNames'].update(projection['ExpressionAttributeNames'])
+
+    items = get_client('dynamodb').query(**params).get('Items', [])
+    return UserRecord.from_item(deserialize_item(items[0])) if items else None
+
+
+def create_user_record(record):
+    """Write a new user record, replacing any existing item with the same userId"""
+    now = utc_now()
+    record.created_at = record.created_at or now
+    record.updated_at = record.updated_at or now
+    get_client('dynamodb').put_item(TableName=_table_name(), Item=serialize_item(record.to_item()))
+    return record
+
+
+def update_user_record(user_id, **changes):
+    """
+    SET the given UserRecord fields on an existing record
+
+    Example:
+        update_user_record(user_id, verified=True)
+    """
+    changes.setdefault('updated_at', utc_now())
+    upsert_user_record(user_id, changes)
+
+
+def upsert_user_record(user_id, changes, create_only=None, condition=None):
+    """
+    Create or update a user record in a single UpdateItem
+
+    Fields in changes are always SET; fields in create_only are only written
+    when the attribute does not exist yet (if_not_exists), so the first
+    writer initialises them and later writers leave them alone. There is no
+    read beforehand, which saves a round trip and removes the race between
+    concurrent writers.
+
+    Args:
+        user_id: Cognito sub
+        changes: UserRecord field -> value, always written
+        create_only: UserRecord field -> value, written only if absent
+        condition: Optional ConditionExpression, may reference the #field
+            and :field placeholders of changes and create_only
+    """
+    create_only = create_only or {}
+    names = {}
+    values = {}
+    assignments = []
+
+    for field, value in changes.items():
+        names[f"#{field}"] = UserRecord.ATTRIBUTE_NAMES[field]
+        values[f":{field}"] = value
+        assignments.append(f"#{field} = :{field}")
+
+    for field, value in create_only.items():
+        names[f"#{field}"] = UserRecord.ATTRIBUTE_NAMES[field]
+        values[f":{field}"] = value
+        assignments.append(f"#{field} = if_not_exists(#{field}, :{field})")
+
+    params = {
+        'TableName': _table_name(),
+        'Key': serialize_item({'userId': user_id}),
+        'UpdateExpression': 'SET ' + ', '.join(assignments),
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': serialize_item(values)
+    }
+    if condition:
+        params['ConditionExpression'] = condition
+
+    get_client('dynamodb').update_item(**params)
+
+
+def record_login(user_id, email, name='', provider='Email', update_provider=True, logged_in_at=None):
+    """
+    Track a successful login, creating the record if it does not exist yet
+
+    Args:
+        user_id: Cognito sub
+        email: User email
+        name: Display name, only written when the record is created
+        provider: Login provider ('Email', 'Google')
+        update_provider: Overwrite the provider of an existing record
+        logged_in_at: ISO timestamp of the login, defaults to now (set when
+            applying deferred login events)
+
+    Returns:
+        bool: True if the record was written
+    """
+    if not user_id or not email:
+        log_event('Missing required user info', level='WARN', user_id=user_id, email=email)
+        return False
+
+    try:
+        now = logged_in_at or utc_now()
+        changes = {'last_login': now, 'updated_at': now, 'status': 'CONFIRMED'}
+        create_only = {'email': email, 'name': name, 'verified': True, 'created_at': now}
+        if update_provider:
+            changes['provider'] = provider
+        else:
+            create_only['provider'] = provider
+
+        # Deferred events can arrive out of order; never move lastLogin backwards
+        condition = None
+        if logged_in_at:
+            condition = 'attribute_not_exists(#last_login) OR #last_login < :last_login'
+
+        upsert_user_record(user_id, changes, create_only, condition=condition)
+        return True
+
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            # A newer login is already recorded
+            return True
+        log_event('Error updating user login record', level='ERROR', error=str(e))
+        return False
+
+    except Exception as e:
+        log_event('Error updating user login record', level='ERROR', error=str(e))
+        return False
@@ -1,9 +1,10 @@
 import json
-import boto3
 import os
 from botocore.exceptions import ClientError
 from datetime import datetime, timedelta
 
+from aws_clients import get_client
+
 def create_response(status_code, body, cookies=None):
     headers = {
         'Content-Type': 'application/json',
@@ -84,7 +85,7 @@ def parse_body(event):
         return {}
 
 def get_user_from_token(token):
-    cognito_client = boto3.client('cognito-idp')
+    cognito_client = get_client('cognito-idp')
     try:
         response = cognito_client.get_user(
             AccessToken=token
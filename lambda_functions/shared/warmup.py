@@ -0,0 +1,93 @@
+import os
+import time
+
+from botocore.exceptions import ClientError
+
+import http_pool
+from concurrency import run_concurrently
+from structured_log import log_event
+
+# Set by Lambda: 'on-demand', 'provisioned-concurrency' or 'snap-start'
+INITIALIZATION_TYPE = os.environ.get('AWS_LAMBDA_INITIALIZATION_TYPE', 'on-demand')
+
+# Pre-warming moves network work into init. That is free when init happens
+# ahead of traffic (provisioned concurrency, SnapStart snapshot), but on an
+# on-demand cold start it would delay the request that triggered it.
+PREWARM_INITIALIZATION_TYPES = {'provisioned-concurrency', 'snap-start'}
+WARMUP_ON_DEMAND = os.environ.get('WARMUP_ON_DEMAND', 'false').lower() == 'true'
+
+# Keep init well inside Lambda's 10 second init limit
+WARMUP_TIMEOUT_SECONDS = 3
+
+try:
+    from snapshot_restore_py import register_after_restore
+except ImportError:
+    register_after_restore = None
+
+
+def prewarm(tasks):
+    """
+    Run initialization tasks during the Lambda init phase
+
+    Tasks are independent and run concurrently; failures are logged and
+    ignored, the handler builds whatever is missing on first use.
+
+    Args:
+        tasks: dict of name -> zero-argument callable (e.g. open a pooled
+               connection, load a JWKS)
+
+    Returns:
+        dict: name -> duration in milliseconds, or None when skipped
+    """
+    if INITIALIZATION_TYPE not in PREWARM_INITIALIZATION_TYPES and not WARMUP_ON_DEMAND:
+        return None
+
+    def timed(task):
+        def run():
+            started = time.perf_counter()
+            task()
+            return round((time.perf_counter() - started) * 1000, 1)
+        return run
+
+    results = run_concurrently(
+        {name: timed(task) for name, task in tasks.items()},
+        timeout=WARMUP_TIMEOUT_SECONDS
+    )
+
+    durations = {}
+    for name, (duration, error) in results.items():
+        if error:
+            log_event('Warmup task failed', level='WARN', task=name, error=str(error))
+        durations[name] = duration
+    log_event('Warmup finished', initializationType=INITIALIZATION_TYPE, durationsMs=durations)
+    return durations
+
+
+def warm_connection(url):
+    """Task that opens a keep-alive connection to url's host ahead of the first request"""
+    return lambda: http_pool.get_pool(url).warm()
+
+
+def warm_aws_call(call):
+    """
+    Task that makes a throwaway AWS call
+
+    The first call on a boto3 client loads the service model, resolves
+    credentials and opens the TLS connection. The call is expected to be
+    rejected (e.g. GetUser with a dummy token); only that setup matters.
+    """
+    def run():
+        try:
+            call()
+        except ClientError:
+            pass
+    return run
+
+
+def _after_restore():
+    # Sockets captured in a SnapStart snapshot are dead after restore
+    http_pool.reset_pools()
+
+
+if register_after_restore:
+    register_after_restore(_after_restore)
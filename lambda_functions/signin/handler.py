@@ -1,98 +1,40 @@
-import json
-import boto3
 import os
 import sys
-import base64
 from botocore.exceptions import ClientError
-from datetime import datetime, timezone
 
 sys.path.append('/opt')
 from utils import create_response, parse_body, create_cookie
-from turnstile import verify_turnstile
+from aws_clients import lazy_client
+from turnstile import verify_turnstile, TURNSTILE_VERIFY_URL
+from auth_tokens import decode_token_payload
+from login_activity import publish_login
+from rate_limiter import throttle
+from warmup import prewarm, warm_aws_call, warm_connection
+from structured_log import logged_handler, log_event
 
-cognito_client = boto3.client('cognito-idp')
-dynamodb = boto3.resource('dynamodb')
+cognito_client = lazy_client('cognito-idp')
 
-def decode_token_payload(token):
-    """Decode JWT token payload (second part)"""
-    try:
-        # JWT tokens have 3 parts separated by dots
-        parts = token.split('.')
-        if len(parts) != 3:
-            return None
-        
-        # Get the payload (middle part) and add padding if needed
-        payload = parts[1]
-        padding = len(payload) % 4
-        if padding:
-            payload += '=' * (4 - padding)
-            
-        decoded_bytes = base64.urlsafe_b64decode(payload)
-        decoded_str = decoded_bytes.decode('utf-8')
-        return json.loads(decoded_str)
-    except Exception:
-        return None
+# Sliding-window limits. The per-IP limit is checked before any Turnstile or
+# Cognito call, so credential-stuffing bursts never reach the shared Cognito
+# quota. The per-email limit only counts attempts that passed Turnstile, so
+# nobody can lock a victim out with requests that carry no solved challenge.
+SIGNIN_WINDOW_SECONDS = 60
+SIGNIN_IP_LIMIT = int(os.environ.get('SIGNIN_IP_LIMIT', '30'))
+SIGNIN_EMAIL_LIMIT = int(os.environ.get('SIGNIN_EMAIL_LIMIT', '10'))
 
-def update_user_login_record(user_info, provider='Email'):
-    """Update user record in DynamoDB for regular email/password signin"""
-    try:
-        table = dynamodb.Table(os.environ['USERS_TABLE'])
-        
-        # Extract user information
-        user_id = user_info.get('sub')
-        email = user_info.get('email')
-        name = user_info.get('name', '')
-        
-        if not user_id or not email:
-            print(f"Missing required user info: user_id={user_id}, email={email}")
-            return False
-        
-        current_time = datetime.now(timezone.utc).isoformat()
-        
-        # Check if user already exists
-        try:
-            response = table.get_item(Key={'userId': user_id})
-            if 'Item' in response:
-                # User exists, update last login and other tracking fields
-                table.update_item(
-                    Key={'userId': user_id},
-                    UpdateExpression='SET lastLogin = :lastLogin, updatedAt = :updatedAt, provider = :provider, #status = :status',
-                    ExpressionAttributeNames={
-                        '#status': 'status'  # 'status' is a reserved word in DynamoDB
-                    },
-                    ExpressionAttributeValues={
-                        ':lastLogin': current_time,
-                        ':updatedAt': current_time,
-                        ':provider': provider,
-                        ':status': 'CONFIRMED'
-                    }
-                )
-                print(f"Updated existing user record for {email} with provider {provider}")
-                return True
-        except Exception as e:
-            print(f"Error checking existing user: {str(e)}")
-        
-        # Create new user record if doesn't exist (shouldn't happen for email signin, but safety net)
-        user_record = {
-            'userId': user_id,
-            'email': email,
-            'name': name,
-            'verified': True,
-            'provider': provider,
-            'createdAt': current_time,
-            'updatedAt': current_time,
-            'lastLogin': current_time,
-            'status': 'CONFIRMED'
-        }
-        
-        table.put_item(Item=user_record)
-        print(f"Created user record for {email} with provider {provider}")
-        return True
-        
-    except Exception as e:
-        print(f"Error updating user login record: {str(e)}")
-        return False
+# Runs only when Lambda initialises ahead of traffic (see shared/warmup.py)
+prewarm({
+    'cognito': warm_aws_call(lambda: cognito_client.get_user(AccessToken='warmup')),
+    'turnstile': warm_connection(TURNSTILE_VERIFY_URL)
+})
+
+def too_many_attempts(retry_after):
+    return create_response(429, {
+        'error': 'Too many sign in attempts. Please try again later.',
+        'retryAfter': retry_after
+    })
 
+@logged_handler('signin')
 def lambda_handler(event, context):
     try:
         body = parse_body(event)
@@ -106,23 +48,35 @@ def lambda_handler(event, context):
                 'error': 'Missing required fields: email and password'
             })
         
+        # Get client IP from API Gateway event
+        client_ip = None
+        if event.get('requestContext', {}).get('identity', {}).get('sourceIp'):
+            client_ip = event['requestContext']['identity']['sourceIp']
+        
         # Verify Turnstile token
         if not turnstile_token:
             return create_response(400, {
                 'error': 'Turnstile verification required'
             })
         
-        # Get client IP from API Gateway event
-        client_ip = None
-        if event.get('requestContext', {}).get('identity', {}).get('sourceIp'):
-            client_ip = event['requestContext']['identity']['sourceIp']
+        allowed, retry_after = throttle([
+            ('signin_ip', client_ip, SIGNIN_IP_LIMIT, SIGNIN_WINDOW_SECONDS)
+        ])
+        if not allowed:
+            return too_many_attempts(retry_after)
         
-        is_valid, error_message = verify_turnstile(turnstile_token, client_ip)
+        is_valid, error_message = verify_turnstile(turnstile_token, client_ip, subject=email)
         if not is_valid:
             return create_response(400, {
                 'error': error_message or 'Turnstile verification failed'
             })
         
+        allowed, retry_after = throttle([
+            ('signin_email', email, SIGNIN_EMAIL_LIMIT, SIGNIN_WINDOW_SECONDS)
+        ])
+        if not allowed:
+            return too_many_attempts(retry_after)
+        
         client_id = os.environ['COGNITO_CLIENT_ID']
         
         try:
@@ -148,13 +102,17 @@ def lambda_handler(event, context):
             # Update user record in DynamoDB with login tracking
             if user_info:
                 # Update database with login activity (lastLogin, provider, status, updatedAt)
-                db_update_success = update_user_login_record(user_info, provider='Email')
+                # Written inline or handed to the async pipeline depending on LOGIN_ACTIVITY_MODE
+                db_update_success = publish_login(
+                    user_info.get('sub'),
+                    user_info.get('email'),
+                    name=user_info.get('name', ''),
+                    provider='Email'
+                )
                 if not db_update_success:
-                    print("Warning: Failed to update user login record in DynamoDB")
-                else:
-                    print(f"Successfully updated login record for user: {user_info.get('email')}")
+                    log_event('Failed to update user login record', level='WARN')
             else:
-                print("Warning: Could not decode ID token for database update")
+                log_event('Could not decode ID token for database update', level='WARN')
             
             # SECURE HTTPONLY COOKIES: Maximum security against XSS and CSRF
             # - HttpOnly: Prevents JavaScript access (XSS protection)
@@ -1,16 +1,112 @@
 import json
-import boto3
 import os
 import sys
 from botocore.exceptions import ClientError
 
 sys.path.append('/opt')
 from utils import create_response, parse_body
+from aws_clients import lazy_client
 from turnstile import verify_turnstile
+from user_store import UserRecord, create_user_record
+from concurrency import run_concurrently, CallTimeoutError
+from structured_log import logged_handler, log_event
 
-cognito_client = boto3.client('cognito-idp')
-dynamodb = boto3.resource('dynamodb')
+cognito_client = lazy_client('cognito-idp')
 
+# Start Cognito sign_up alongside Turnstile verification instead of after it.
+# A sign_up that lands before a failed bot check is rolled back with
+# admin_delete_user, but only once admin_get_user confirms it is still the
+# UNCONFIRMED user this request created. Cognito sends the verification
+# email as part of sign_up, so in this mode requests that fail the bot check
+# still deliver a code to the submitted address.
+SPECULATIVE_SIGNUP = os.environ.get('SPECULATIVE_SIGNUP', 'false').lower() == 'true'
+
+# sign_up is not idempotent, so give it longer than the usual fan-out
+# deadline before treating it as lost
+SIGN_UP_TIMEOUT_SECONDS = 10
+
+
+def sign_up_user(email, password, name):
+    return cognito_client.sign_up(
+        ClientId=os.environ['COGNITO_CLIENT_ID'],
+        Username=email,
+        Password=password,
+        UserAttributes=[
+            {
+                'Name': 'email',
+                'Value': email
+            },
+            {
+                'Name': 'name',
+                'Value': name
+            }
+        ]
+    )
+
+
+def rollback_sign_up(email, user_sub):
+    """
+    Delete a user created by a speculative sign_up whose bot check failed
+
+    The account is only deleted while it still has the sub returned by this
+    request's sign_up and is UNCONFIRMED, so an existing or since-confirmed
+    account under the same email is never touched.
+
+    Returns:
+        bool: True if the user is gone (deleted or never created)
+    """
+    user_pool_id = os.environ['COGNITO_USER_POOL_ID']
+    try:
+        user = cognito_client.admin_get_user(UserPoolId=user_pool_id, Username=email)
+        attributes = {attr['Name']: attr['Value'] for attr in user.get('UserAttributes', [])}
+        if attributes.get('sub') != user_sub or user.get('UserStatus') != 'UNCONFIRMED':
+            log_event('Speculative sign up not rolled back, account is not the one created', level='WARN')
+            return False
+
+        cognito_client.admin_delete_user(UserPoolId=user_pool_id, Username=email)
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'UserNotFoundException':
+            return True
+        log_event('Error rolling back speculative sign up', level='ERROR', error=str(e))
+        return False
+
+
+def speculative_sign_up(email, password, name, turnstile_token, client_ip):
+    """
+    Run Turnstile verification and Cognito sign_up concurrently
+
+    The Turnstile outcome always takes precedence: if it fails, the user
+    the sign_up created is deleted and only the Turnstile error is
+    reported, so bots learn nothing about existing accounts. A sign_up
+    that timed out is left alone since its UserSub is unknown; it stays
+    UNCONFIRMED, like a sign up that was never verified.
+
+    Returns:
+        tuple: (sign_up_response, turnstile_error). sign_up errors are re-raised.
+    """
+    results = run_concurrently({
+        'turnstile': lambda: verify_turnstile(turnstile_token, client_ip, subject=email),
+        'sign_up': (lambda: sign_up_user(email, password, name), SIGN_UP_TIMEOUT_SECONDS)
+    })
+
+    turnstile_result, turnstile_call_error = results['turnstile']
+    is_valid, error_message = turnstile_result or (False, f"Turnstile verification error: {str(turnstile_call_error)}")
+    response, sign_up_error = results['sign_up']
+
+    if not is_valid:
+        if response:
+            rollback_sign_up(email, response['UserSub'])
+        elif isinstance(sign_up_error, CallTimeoutError):
+            log_event('Speculative sign up timed out, not rolled back', level='WARN')
+        return None, error_message or 'Turnstile verification failed'
+
+    if sign_up_error:
+        raise sign_up_error
+    return response, None
+
+
+@logged_handler('signup')
 def lambda_handler(event, context):
     try:
         body = parse_body(event)
@@ -36,41 +132,29 @@ def lambda_handler(event, context):
         if event.get('requestContext', {}).get('identity', {}).get('sourceIp'):
             client_ip = event['requestContext']['identity']['sourceIp']
         
-        is_valid, error_message = verify_turnstile(turnstile_token, client_ip)
-        if not is_valid:
-            return create_response(400, {
-                'error': error_message or 'Turnstile verification failed'
-            })
-        
-        client_id = os.environ['COGNITO_CLIENT_ID']
-        
         try:
-            response = cognito_client.sign_up(
-                ClientId=client_id,
-                Username=email,
-                Password=password,
-                UserAttributes=[
-                    {
-                        'Name': 'email',
-                        'Value': email
-                    },
-                    {
-                        'Name': 'name',
-                        'Value': name
-                    }
-                ]
-            )
+            if SPECULATIVE_SIGNUP:
+                response, error_message = speculative_sign_up(
+                    email, password, name, turnstile_token, client_ip
+                )
+                if error_message:
+                    return create_response(400, {'error': error_message})
+            else:
+                is_valid, error_message = verify_turnstile(turnstile_token, client_ip, subject=email)
+                if not is_valid:
+                    return create_response(400, {
+                        'error': error_message or 'Turnstile verification failed'
+                    })
+                
+                response = sign_up_user(email, password, name)
             
-            table = dynamodb.Table(os.environ['USERS_TABLE'])
-            table.put_item(
-                Item={
-                    'userId': response['UserSub'],
-                    'email': email,
-                    'name': name,
-                    'createdAt': context.aws_request_id,
-                    'verified': False
-                }
-            )
+            # Only persisted once both the bot check and sign_up succeeded
+            create_user_record(UserRecord(
+                user_id=response['UserSub'],
+                email=email,
+                name=name,
+                verified=False
+            ))
             
             return create_response(200, {
                 'message': 'User registered successfully. Please check your email for verification code.',
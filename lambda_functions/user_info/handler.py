@@ -1,36 +1,33 @@
-import json
-import boto3
 import os
 import sys
+import time
 from botocore.exceptions import ClientError
-import base64
 
 sys.path.append('/opt')
 from utils import create_response
+from aws_clients import lazy_client
+from auth_tokens import parse_cookies, decode_token_payload
+from ttl_cache import TTLCache, hashed_key
+from metrics import record_cache_result
+from user_store import get_user_record
+from concurrency import run_concurrently, CallTimeoutError
+from warmup import prewarm, warm_aws_call
+from structured_log import logged_handler, log_event
 
-cognito_client = boto3.client('cognito-idp')
-dynamodb = boto3.resource('dynamodb')
+cognito_client = lazy_client('cognito-idp')
 
-def decode_token_payload(token):
-    """Decode JWT token payload (second part)"""
-    try:
-        # JWT tokens have 3 parts separated by dots
-        parts = token.split('.')
-        if len(parts) != 3:
-            return None
-        
-        # Get the payload (middle part) and add padding if needed
-        payload = parts[1]
-        padding = len(payload) % 4
-        if padding:
-            payload += '=' * (4 - padding)
-            
-        decoded_bytes = base64.urlsafe_b64decode(payload)
-        decoded_str = decoded_bytes.decode('utf-8')
-        return json.loads(decoded_str)
-    except Exception:
-        return None
+# Warm-container response cache: repeated dashboard loads from the same session
+# skip Cognito and DynamoDB. Entries never outlive the access token.
+USER_INFO_CACHE_TTL_SECONDS = int(os.environ.get('USER_INFO_CACHE_TTL_SECONDS', '60'))
+user_info_cache = TTLCache(max_entries=256)
+
+# Runs only when Lambda initialises ahead of traffic (see shared/warmup.py)
+prewarm({
+    'cognito': warm_aws_call(lambda: cognito_client.get_user(AccessToken='warmup')),
+    'users_table': lambda: get_user_record('warmup', fields=['user_id'])
+})
 
+@logged_handler('user_info')
 def lambda_handler(event, context):
     """
     SECURE USER INFO RETRIEVAL VIA HTTPONLY COOKIES
@@ -40,9 +37,12 @@ def lambda_handler(event, context):
     
     SECURITY IMPLEMENTATION:
     - Extracts both accessToken and idToken from httpOnly cookies
-    - Validates accessToken with AWS Cognito for authentication
+    - Validates accessToken with AWS Cognito for authentication, while the
+      DynamoDB profile read runs concurrently
     - Decodes idToken (JWT) to extract user profile information
     - Returns structured user data without exposing raw tokens
+    - Caches responses per session until the earlier of token expiry and
+      USER_INFO_CACHE_TTL_SECONDS (0 disables the cache)
     
     TOKEN REQUIREMENTS:
     - accessToken: Required for Cognito authentication validation
@@ -56,33 +56,45 @@ def lambda_handler(event, context):
     - Same-domain architecture enables secure cookie sharing
     """
     try:
-        # Extract tokens from httpOnly cookies
-        # API Gateway can pass cookies in different ways
-        headers = event.get('headers', {})
-        cookies = headers.get('Cookie') or headers.get('cookie', '')
-        access_token = None
-        id_token = None
-        
-        if cookies:
-            for cookie in cookies.split(';'):
-                cookie = cookie.strip()
-                if cookie.startswith('accessToken='):
-                    access_token = cookie.split('=', 1)[1]
-                elif cookie.startswith('idToken='):
-                    id_token = cookie.split('=', 1)[1]
+        # Extract tokens from httpOnly cookies (any header casing, single or multi-value)
+        cookies = parse_cookies(event)
+        access_token = cookies.get('accessToken')
+        id_token = cookies.get('idToken')
         
         if not access_token or not id_token:
             return create_response(401, {'error': 'Authentication tokens not found'})
         
+        key = hashed_key(access_token, id_token)
+        if USER_INFO_CACHE_TTL_SECONDS > 0:
+            cached_user_data = user_info_cache.get(key)
+            record_cache_result('user_info', user_info_cache, cached_user_data is not None)
+            if cached_user_data is not None:
+                return create_response(200, cached_user_data)
+        
         try:
-            # Verify access token with Cognito
-            cognito_response = cognito_client.get_user(
-                AccessToken=access_token
-            )
-            
-            # Decode ID token to get user info
+            # Decode ID token to get user info (local, no network)
             user_info = decode_token_payload(id_token)
             
+            # Cognito validation and the DynamoDB read are independent, so run them together
+            calls = {
+                'cognito': lambda: cognito_client.get_user(AccessToken=access_token)
+            }
+            if user_info:
+                calls['db_user'] = lambda: get_user_record(
+                    user_info.get('sub'),
+                    fields=['provider', 'created_at', 'last_login', 'status']
+                )
+            results = run_concurrently(calls)
+            
+            # Verify access token with Cognito
+            cognito_response, cognito_error = results['cognito']
+            if isinstance(cognito_error, CallTimeoutError):
+                # Cognito did not answer in time: the token is unverified, not invalid
+                log_event('Cognito token check timed out', level='WARN')
+                return create_response(503, {'error': 'Service temporarily unavailable, please retry'})
+            if cognito_error:
+                raise cognito_error
+            
             if not user_info:
                 return create_response(400, {'error': 'Invalid ID token'})
             
@@ -98,23 +110,24 @@ def lambda_handler(event, context):
                 'iat': user_info.get('iat')
             }
             
-            # Try to get additional info from DynamoDB
-            try:
-                table = dynamodb.Table(os.environ['USERS_TABLE'])
-                db_response = table.get_item(Key={'user_id': user_info.get('sub')})
-                
-                if 'Item' in db_response:
-                    db_user = db_response['Item']
-                    # Merge DynamoDB data with JWT data
-                    user_data.update({
-                        'provider': db_user.get('provider', 'COGNITO'),
-                        'created_at': db_user.get('created_at'),
-                        'last_login': db_user.get('last_login'),
-                        'status': db_user.get('status', 'CONFIRMED')
-                    })
-                    print(f"Retrieved additional user info from DynamoDB for {user_info.get('email')}")
-            except Exception as e:
-                print(f"Warning: Could not retrieve user info from DynamoDB: {str(e)}")
+            # Merge additional info from DynamoDB (only the fields returned below)
+            db_user, db_error = results['db_user']
+            if db_error:
+                log_event('Could not retrieve user info from DynamoDB', level='WARN', error=str(db_error))
+            elif db_user:
+                # Merge DynamoDB data with JWT data
+                user_data.update({
+                    'provider': db_user.provider or 'COGNITO',
+                    'created_at': db_user.created_at,
+                    'last_login': db_user.last_login,
+                    'status': db_user.status or 'CONFIRMED'
+                })
+            
+            # Cache until the access token expires, capped by the configured TTL
+            token_exp = (decode_token_payload(access_token) or {}).get('exp')
+            if USER_INFO_CACHE_TTL_SECONDS > 0 and isinstance(token_exp, (int, float)):
+                expires_at = min(token_exp, time.time() + USER_INFO_CACHE_TTL_SECONDS)
+                user_info_cache.set(key, user_data, expires_at)
             
             # Return user information
             return create_response(200, user_data)
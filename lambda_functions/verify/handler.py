@@ -1,15 +1,17 @@
 import json
-import boto3
 import os
 import sys
 from botocore.exceptions import ClientError
 
 sys.path.append('/opt')
 from utils import create_response, parse_body
+from aws_clients import lazy_client
+from user_store import find_user_by_email, update_user_record
+from structured_log import logged_handler
 
-cognito_client = boto3.client('cognito-idp')
-dynamodb = boto3.resource('dynamodb')
+cognito_client = lazy_client('cognito-idp')
 
+@logged_handler('verify')
 def lambda_handler(event, context):
     try:
         body = parse_body(event)
@@ -32,22 +34,11 @@ def lambda_handler(event, context):
             )
             
             # Update user verification status in DynamoDB
-            table = dynamodb.Table(os.environ['USERS_TABLE'])
-            
             # First, get the user's userId by email
-            response = table.query(
-                IndexName='EmailIndex',
-                KeyConditionExpression='email = :email',
-                ExpressionAttributeValues={':email': email}
-            )
+            user_record = find_user_by_email(email, fields=['user_id'])
             
-            if response['Items']:
-                user_id = response['Items'][0]['userId']
-                table.update_item(
-                    Key={'userId': user_id},
-                    UpdateExpression='SET verified = :val',
-                    ExpressionAttributeValues={':val': True}
-                )
+            if user_record:
+                update_user_record(user_record.user_id, verified=True)
             
             return create_response(200, {
                 'message': 'Email verified successfully',
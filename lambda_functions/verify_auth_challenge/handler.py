@@ -0,0 +1,23 @@
+import sys
+
+sys.path.append('/opt')
+from federated_auth import verify_federated_answer
+from structured_log import logged_handler
+
+@logged_handler('verify_auth_challenge')
+def lambda_handler(event, context):
+    """
+    Cognito Verify Auth Challenge Response Trigger
+
+    Accepts the answer only if it is the HMAC proof for this user's email
+    and the nonce issued by create_auth_challenge for this session.
+    """
+    request = event['request']
+    email = request.get('userAttributes', {}).get('email')
+    nonce = request.get('privateChallengeParameters', {}).get('nonce')
+
+    event['response']['answerCorrect'] = verify_federated_answer(
+        email, nonce, request.get('challengeAnswer')
+    )
+
+    return event
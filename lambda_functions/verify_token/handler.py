@@ -1,14 +1,29 @@
 import json
-import boto3
 import os
 import sys
 from botocore.exceptions import ClientError
 
 sys.path.append('/opt')
 from utils import create_response
+from aws_clients import lazy_client
+from jwt_verifier import verify_cognito_token, cognito_jwks_url
+from auth_tokens import parse_cookies
+from oidc_metadata import prefetch_jwks
+from warmup import prewarm
+from structured_log import logged_handler
 
-cognito_client = boto3.client('cognito-idp')
+cognito_client = lazy_client('cognito-idp')
 
+# Strict mode confirms every token with Cognito GetUser so revoked sessions
+# are rejected immediately, at the cost of a network round trip per check
+STRICT_TOKEN_VERIFICATION = os.environ.get('STRICT_TOKEN_VERIFICATION', 'false').lower() == 'true'
+
+# Runs only when Lambda initialises ahead of traffic (see shared/warmup.py)
+prewarm({
+    'cognito_jwks': lambda: prefetch_jwks(cognito_jwks_url())
+})
+
+@logged_handler('verify_token')
 def lambda_handler(event, context):
     """
     HTTPONLY COOKIE AUTHENTICATION VERIFICATION
@@ -18,7 +33,8 @@ def lambda_handler(event, context):
     
     SECURITY ARCHITECTURE:
     - Extracts accessToken from httpOnly cookie headers
-    - Validates token with AWS Cognito User Pool
+    - Validates token signature and claims locally against the pool's JWKS
+    - Optionally confirms the token with AWS Cognito (strict mode)
     - Returns 200 for valid authentication, 401 for invalid/expired
     - No token exposure to frontend JavaScript
     
@@ -32,28 +48,24 @@ def lambda_handler(event, context):
     - Same root domain enables SameSite=Strict cookie sharing
     """
     try:
-        # Extract access token from httpOnly cookie
-        # API Gateway can pass cookies in different ways
-        headers = event.get('headers', {})
-        cookies = headers.get('Cookie') or headers.get('cookie', '')
-        access_token = None
-        
-        if cookies:
-            for cookie in cookies.split(';'):
-                cookie = cookie.strip()
-                if cookie.startswith('accessToken='):
-                    access_token = cookie.split('=', 1)[1]
-                    break
+        # Extract access token from httpOnly cookie (any header casing, single or multi-value)
+        access_token = parse_cookies(event).get('accessToken')
         
         if not access_token:
             return create_response(401, {'error': 'No access token found'})
         
         try:
-            # Verify token with Cognito
-            response = cognito_client.get_user(
-                AccessToken=access_token
+            # Verify token locally (JWKS cached per container), strict mode also asks Cognito
+            claims, error_message = verify_cognito_token(
+                access_token,
+                token_use='access',
+                strict=STRICT_TOKEN_VERIFICATION,
+                cognito_client=cognito_client
             )
             
+            if not claims:
+                return create_response(401, {'error': 'Invalid or expired token'})
+            
             return create_response(200, {
                 'message': 'Token is valid',
                 'authenticated': True
@@ -28,6 +28,11 @@ output "dynamodb_table_name" {
   value       = aws_dynamodb_table.users.name
 }
 
+output "rate_limit_table_name" {
+  description = "DynamoDB rate-limit counters table name"
+  value       = aws_dynamodb_table.rate_limits.name
+}
+
 output "lambda_function_names" {
   description = "Lambda function names"
   value = {
@@ -0,0 +1,29 @@
+# Login Activity Queue
+# Carries compact login events from signin/google_auth to the login activity
+# consumer when login_activity_mode = "sqs", keeping DynamoDB writes off the
+# sign-in critical path.
+resource "aws_sqs_queue" "login_activity_dlq" {
+  name                      = "${var.project_name}-${var.environment}-login-activity-dlq"
+  message_retention_seconds = 1209600 # 14 days
+
+  tags = {
+    Environment = var.environment
+    Project     = var.project_name
+  }
+}
+
+resource "aws_sqs_queue" "login_activity" {
+  name                       = "${var.project_name}-${var.environment}-login-activity"
+  message_retention_seconds  = 86400 # 1 day
+  visibility_timeout_seconds = 60    # Must be at least the consumer timeout
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.login_activity_dlq.arn
+    maxReceiveCount     = 5
+  })
+
+  tags = {
+    Environment = var.environment
+    Project     = var.project_name
+  }
+}
@@ -151,6 +151,63 @@ variable "system_alert_email" {
   sensitive   = true
 }
 
+# DynamoDB Access Configuration
+variable "users_table_consistent_read" {
+  description = "Use strongly consistent reads for users table lookups (eventually consistent reads cost half)"
+  type        = bool
+  default     = false
+}
+
+# Login Activity Pipeline
+variable "login_activity_mode" {
+  description = "How signin/google_auth record login activity: sync (inline DynamoDB write), sqs or log (applied asynchronously by the consumer)"
+  type        = string
+  default     = "sync"
+  validation {
+    condition     = contains(["sync", "sqs", "log"], var.login_activity_mode)
+    error_message = "Login activity mode must be sync, sqs, or log."
+  }
+}
+
+# Lambda Warm Start Variables
+variable "enable_provisioned_concurrency" {
+  description = "Keep provisioned concurrency on functions whose warm_strategy is \"provisioned\" (billed while allocated; enable for production)"
+  type        = bool
+  default     = false
+}
+
+variable "lambda_warm_strategy_overrides" {
+  description = "Per-function warm_strategy overrides (none, provisioned or snapstart), keyed by function name"
+  type        = map(string)
+  default     = {}
+  validation {
+    condition     = alltrue([for strategy in values(var.lambda_warm_strategy_overrides) : contains(["none", "provisioned", "snapstart"], strategy)])
+    error_message = "Warm strategy must be none, provisioned, or snapstart."
+  }
+}
+
+variable "provisioned_concurrency_min" {
+  description = "Provisioned concurrent executions always kept initialised per warmed function"
+  type        = number
+  default     = 1
+}
+
+variable "provisioned_concurrency_max" {
+  description = "Upper bound for autoscaled provisioned concurrency per warmed function"
+  type        = number
+  default     = 5
+}
+
+variable "provisioned_concurrency_target_utilization" {
+  description = "Provisioned concurrency utilization (0-1) that autoscaling tracks"
+  type        = number
+  default     = 0.7
+  validation {
+    condition     = var.provisioned_concurrency_target_utilization > 0 && var.provisioned_concurrency_target_utilization < 1
+    error_message = "Target utilization must be between 0 and 1."
+  }
+}
+
 # Destroy Protection Variables
 variable "skip_destroy_cloudwatch_logs" {
   description = "Skip destroying CloudWatch log groups on terraform destroy"
@@ -343,6 +400,12 @@ variable "google_client_secret" {
   sensitive   = true
 }
 
+variable "oidc_providers" {
+  description = "Extra OpenID Connect providers for the shared metadata cache, keyed by name (issuer, optional issuers, discovery_url, defaults)"
+  type        = any
+  default     = {}
+}
+
 # Cloudflare Turnstile Configuration Variables
 variable "turnstile_site_key" {
   description = "Cloudflare Turnstile site key for frontend widget"
@@ -356,3 +419,46 @@ variable "turnstile_secret_key" {
   sensitive   = true
 }
 
+variable "turnstile_cache_ttl_seconds" {
+  description = "How long a warm Lambda container accepts one retry of an already-verified Turnstile token from the same IP and email (0 disables)"
+  type        = number
+  default     = 30
+  validation {
+    condition     = var.turnstile_cache_ttl_seconds >= 0 && var.turnstile_cache_ttl_seconds <= 300
+    error_message = "Turnstile cache TTL must be between 0 and 300 seconds (the token lifetime)."
+  }
+}
+
+variable "speculative_signup" {
+  description = "Start Cognito sign-up concurrently with Turnstile verification; users created before a failed bot check are deleted, but Cognito has already sent them a verification email"
+  type        = bool
+  default     = false
+}
+
+
+# Token Verification Configuration Variables
+variable "strict_token_verification" {
+  description = "Confirm every verify-token check with Cognito GetUser (catches revoked sessions, costs a round trip per request)"
+  type        = bool
+  default     = false
+}
+
+variable "user_info_cache_ttl_seconds" {
+  description = "Maximum lifetime of a cached user-info response in a warm Lambda container (0 disables the cache)"
+  type        = number
+  default     = 60
+  validation {
+    condition     = var.user_info_cache_ttl_seconds >= 0 && var.user_info_cache_ttl_seconds <= 3600
+    error_message = "User info cache TTL must be between 0 and 3600 seconds."
+  }
+}
+
+variable "log_success_sample_rate" {
+  description = "Share of successful API invocations whose structured log line is written (errors and warnings are always logged)"
+  type        = number
+  default     = 1
+  validation {
+    condition     = var.log_success_sample_rate >= 0 && var.log_success_sample_rate <= 1
+    error_message = "Log success sample rate must be between 0 and 1."
+  }
+}